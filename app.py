@@ -1,309 +1,513 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Blueprint, Flask, g, render_template, request
 from flask_cors import CORS
+from werkzeug.exceptions import BadRequest, HTTPException, NotFound
 import json
+import logging
+import os
 import random
-from datetime import datetime
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Tuple
 
-from cube_solver import CubeSolver
-from models import RubiksCube
+import orjson
+
+from cube_solver import CubeSolver, Step
+from models import LEGAL_MOVES, MOVE_NAMES, RubiksCube
+
+# Try to import flask-compress, fallback to uncompressed responses
+try:
+    from flask_compress import Compress
+    COMPRESS_AVAILABLE = True
+except ImportError:
+    COMPRESS_AVAILABLE = False
 
 app = Flask(__name__)
 CORS(app)
+if COMPRESS_AVAILABLE:
+    # Solve payloads are large, repetitive JSON
+    app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+    app.config['COMPRESS_MIN_SIZE'] = 512
+    Compress(app)
+logger = app.logger
+api = Blueprint('api', __name__, url_prefix='/api')
+
+# Longest scramble /scramble will generate
+MAX_SCRAMBLE_LENGTH = 1000
+
+# Longest client-chosen cube_id /new-cube will store
+MAX_CUBE_ID_LENGTH = 64
 
-# Global cube instance - default 3x3
-cube = RubiksCube(3)
+# Per-client cube store keyed by cube_id, bounded LRU. LOCK guards the
+# store; each cube has its own lock, held by a handler for its whole
+# read-modify-respond so concurrent requests on one cube can't interleave
+MAX_CUBES = 10000
+CUBES: 'OrderedDict[str, Tuple[RubiksCube, threading.Lock]]' = OrderedDict()
+LOCK = threading.RLock()
 solver = CubeSolver()
+solver.warmup()  # Build solver tables once at import, not on the first request
+
+def _store_cube(cube: RubiksCube, cube_id: str = None) -> str:
+    """Register a cube under cube_id (or a fresh id), evicting the oldest if full"""
+    cube_id = cube_id or uuid.uuid4().hex
+    with LOCK:
+        CUBES[cube_id] = (cube, threading.Lock())
+        CUBES.move_to_end(cube_id)
+        while len(CUBES) > MAX_CUBES:
+            CUBES.popitem(last=False)
+    return cube_id
+
+# Shared stand-in for reads without a cube_id: a solved 3x3 that is never
+# stored or mutated, so id-less polling can't evict real clients' cubes
+_BLANK_CUBE = (RubiksCube(3), threading.Lock())
+
+def _get_cube(read_only: bool = False):
+    """
+    Look up the caller's cube by cube_id -> (cube_id, cube, cube lock)
+    
+    Cubes are only created by /api/new-cube. Without a cube_id, reads see
+    a shared solved 3x3 (cube_id None) and writes are a 400; an unknown or
+    evicted cube_id is a 404.
+    """
+    cube_id = g.json.get('cube_id') or request.args.get('cube_id')
+    if not cube_id:
+        if read_only:
+            return (None,) + _BLANK_CUBE
+        raise BadRequest('cube_id is required; create a cube with /api/new-cube')
+    with LOCK:
+        entry = CUBES.get(cube_id) if isinstance(cube_id, str) else None
+        if entry is None:
+            raise NotFound('unknown cube_id')
+        CUBES.move_to_end(cube_id)
+        return (cube_id,) + entry
+
+def ojsonify(obj):
+    """jsonify() replacement backed by orjson (also serializes NumPy arrays)"""
+    return app.response_class(
+        orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY),
+        mimetype='application/json'
+    )
+
+# Solves run in worker processes so CPU-bound searches don't hold this
+# process's GIL; created on first use so forked server workers get their own.
+# Forked workers inherit the warmed tables; the initializer covers spawned ones
+SOLVE_TIMEOUT = 60
+_executor = None
+_executor_lock = threading.Lock()
+
+def _get_executor() -> ProcessPoolExecutor:
+    """Create the solve process pool on first use"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=os.cpu_count(), initializer=solver.warmup)
+    return _executor
+
+def _solve_worker(state_string: str, move_history: tuple, algorithm: str) -> dict:
+    """Rebuild the cube from its compact form and solve it (runs in the pool)"""
+    working_cube = RubiksCube.from_state_string(state_string, list(move_history))
+    return solver.solve(working_cube, algorithm)
+
+# Successful solve results keyed by (state, history, algorithm), bounded LRU;
+# history is left out of the key for solvers that never read it
+MAX_SOLVES = 4096
+SOLVES: 'OrderedDict[tuple, dict]' = OrderedDict()
+SOLVES_LOCK = threading.Lock()
+
+def _solve_cached(size: int, state_string: str, move_history: tuple, algorithm: str) -> dict:
+    """
+    Solve a cube identified by its stickers and move history
+    
+    Solvers that fall back to undoing move_history get it in the key; for
+    the rest the same stickers hit whatever the history. Only successful
+    results are cached, so a failed solve is retried next time; a cache hit
+    reports a solve time of 0. Moves and steps are frozen into tuples
+    because cached results are shared.
+    """
+    algorithm = solver.resolve_algorithm(size, algorithm)
+    history_key = move_history if algorithm in CubeSolver.HISTORY_ALGORITHMS else None
+    key = (state_string, history_key, algorithm)
+    with SOLVES_LOCK:
+        cached = SOLVES.get(key)
+        if cached is not None:
+            SOLVES.move_to_end(key)
+            return dict(cached, time=0)
+    
+    future = _get_executor().submit(_solve_worker, state_string, move_history, algorithm)
+    result = future.result(timeout=SOLVE_TIMEOUT)
+    if not result.get('success'):
+        return result
+    if result.get('moves'):
+        result['moves'] = tuple(result['moves'])
+    if result.get('steps'):
+        result['steps'] = tuple(result['steps'])
+    with SOLVES_LOCK:
+        SOLVES[key] = result
+        while len(SOLVES) > MAX_SOLVES:
+            SOLVES.popitem(last=False)
+    return result
 
 @app.route('/')
 def index():
     """Main application page"""
     return render_template('index.html')
 
-@app.route('/api/new-cube', methods=['POST'])
+@api.before_request
+def parse_json():
+    """Parse the JSON body once per request; non-JSON bodies read as {}"""
+    data = request.get_json(silent=True)
+    g.json = data if isinstance(data, dict) else {}
+
+@api.errorhandler(404)  # Takes precedence over the app's generic 404 page
+@api.errorhandler(Exception)
+def api_error(error):
+    """Shared error envelope: bad input is a 400, anything else a 500"""
+    if isinstance(error, HTTPException):
+        return ojsonify({'success': False, 'error': error.description}), error.code
+    # Exception text stays in the log; handlers validate input themselves
+    if isinstance(error, (ValueError, TypeError, KeyError)):
+        logger.warning("%s bad request: %s", request.path, error)
+        return ojsonify({'success': False, 'error': 'Invalid request data'}), 400
+    logger.error("%s error: %s", request.path, error)
+    return ojsonify({'success': False, 'error': 'Internal server error'}), 500
+
+def _is_int(value) -> bool:
+    """JSON integer check (bool is an int subclass but not a valid count)"""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+@api.route('/new-cube', methods=['POST'])
 def create_new_cube():
     """Create a new cube with specified size"""
-    global cube
-    try:
-        data = request.get_json() or {}
-        size = data.get('size', 3)
-        
-        # Validate size
-        if size < 2 or size > 7:  # Reasonable limits
-            return jsonify({
-                'success': False,
-                'error': 'Cube size must be between 2 and 7'
-            }), 400
-        
-        cube = RubiksCube(size)
-        
-        return jsonify({
-            'success': True,
-            'size': size,
-            'state': cube.get_state(),
-            'is_solved': cube.is_solved(),
-            'move_count': cube.get_move_count()
-        })
-    except Exception as e:
-        return jsonify({
+    size = g.json.get('size', 3)
+    
+    # Validate size
+    if not _is_int(size) or size < 2 or size > 7:  # Reasonable limits
+        return ojsonify({
             'success': False,
-            'error': str(e)
-        }), 500
-
-@app.route('/api/state', methods=['GET'])
-@app.route('/api/cube-state', methods=['GET'])
-def get_cube_state():
-    """Get current cube state"""
-    return jsonify({
+            'error': 'Cube size must be between 2 and 7'
+        }), 400
+    
+    cube_id = g.json.get('cube_id', request.args.get('cube_id'))
+    if cube_id is not None and (not isinstance(cube_id, str) or not 0 < len(cube_id) <= MAX_CUBE_ID_LENGTH):
+        return ojsonify({
+            'success': False,
+            'error': f'cube_id must be a non-empty string of at most {MAX_CUBE_ID_LENGTH} characters'
+        }), 400
+    
+    cube = RubiksCube(size)
+    cube_id = _store_cube(cube, cube_id)
+    
+    return ojsonify({
+        'success': True,
+        'cube_id': cube_id,
+        'size': size,
         'state': cube.get_state(),
         'is_solved': cube.is_solved(),
-        'move_count': cube.get_move_count(),
-        'timestamp': datetime.now().isoformat()
+        'move_count': cube.get_move_count()
     })
 
-@app.route('/api/scramble', methods=['POST'])
+def _not_modified(cube: RubiksCube):
+    """
+    304 response if the client's If-None-Match matches the cube's state
+    version, else None; polling endpoints skip serialization on a hit
+    """
+    if request.if_none_match.contains_weak(str(cube._state_version)):
+        response = app.response_class(status=304)
+        response.set_etag(str(cube._state_version), weak=True)
+        return response
+    return None
+
+def _with_etag(response, cube: RubiksCube):
+    """Tag a polling response with the cube's state version"""
+    response.set_etag(str(cube._state_version), weak=True)
+    return response
+
+@api.route('/state', methods=['GET'])
+@api.route('/cube-state', methods=['GET'])
+def get_cube_state():
+    """Get current cube state"""
+    cube_id, cube, lock = _get_cube(read_only=True)
+    with lock:
+        not_modified = _not_modified(cube)
+        if not_modified is not None:
+            return not_modified
+        return _with_etag(ojsonify({
+            'cube_id': cube_id,
+            'state': cube.get_state(),
+            'is_solved': cube.is_solved(),
+            'move_count': cube.get_move_count(),
+            'timestamp': time.time()
+        }), cube)
+
+@api.route('/scramble', methods=['POST'])
 def scramble_cube():
     """Generate and apply a random scramble"""
-    try:
-        data = request.get_json() or {}
-        length = data.get('moves', 25)  # Changed from 'length' to 'moves' to match frontend
-        
-        print(f"Before scramble - Is solved: {cube.is_solved()}")
-        print(f"Before scramble state: {cube.get_state()}")
+    cube_id, cube, lock = _get_cube()
+    length = g.json.get('moves', 25)  # Changed from 'length' to 'moves' to match frontend
+    
+    if not _is_int(length) or length < 0 or length > MAX_SCRAMBLE_LENGTH:
+        return ojsonify({
+            'success': False,
+            'error': f'Scramble length must be between 0 and {MAX_SCRAMBLE_LENGTH}'
+        }), 400
+    
+    with lock:
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Before scramble - Is solved: %s", cube.is_solved())
+            logger.debug("Before scramble state: %s", cube.get_state())
         
-        scramble_moves = cube.generate_scramble(length)
-        print(f"Generated scramble moves: {scramble_moves}")
+        # Draw and apply integer move ids; notation is only needed for the response
+        scramble_ids = cube.generate_scramble_ids(length)
+        cube.apply_move_ids(scramble_ids)
+        scramble_moves = [MOVE_NAMES[move_id] for move_id in scramble_ids.tolist()]
+        logger.debug("Generated scramble moves: %s", scramble_moves)
         
-        cube.apply_move_sequence(scramble_moves)
+        state = cube.get_state()
+        solved = cube.is_solved()
         
-        print(f"After scramble - Is solved: {cube.is_solved()}")
-        print(f"After scramble state: {cube.get_state()}")
+        logger.debug("After scramble - Is solved: %s", solved)
+        logger.debug("After scramble state: %s", state)
         
         result = {
             'success': True,
+            'cube_id': cube_id,
             'moves': scramble_moves,  # Changed from 'scramble' to 'moves'
-            'state': cube.get_state(),
-            'is_solved': cube.is_solved(),
+            'state': state,
+            'is_solved': solved,
             'move_count': cube.get_move_count()
         }
-        
-        print(f"Returning result: {result}")
-        return jsonify(result)
-    except Exception as e:
-        print(f"Scramble error: {e}")
-        return jsonify({
-            'success': False,
-            'error': str(e)
-        }), 400
+    
+    logger.debug("Returning result: %s", result)
+    return ojsonify(result)
 
-@app.route('/api/move', methods=['POST'])
+@api.route('/move', methods=['POST'])
 def execute_move():
     """Execute a single move"""
-    try:
-        data = request.get_json()
-        move = data.get('move')
-        
-        if not move:
-            return jsonify({
-                'success': False,
-                'error': 'Move is required'
-            }), 400
-        
+    cube_id, cube, lock = _get_cube()
+    move = g.json.get('move')
+    
+    if not move:
+        return ojsonify({
+            'success': False,
+            'error': 'Move is required'
+        }), 400
+    
+    if not isinstance(move, str) or move not in LEGAL_MOVES:
+        return ojsonify({
+            'success': False,
+            'error': f'Invalid move: {move}'
+        }), 400
+    
+    with lock:
         success = cube.apply_move(move)
         
-        return jsonify({
+        return ojsonify({
             'success': success,
+            'cube_id': cube_id,
             'move': move,
             'state': cube.get_state(),
             'is_solved': cube.is_solved(),
             'move_count': cube.get_move_count()
         })
-    except Exception as e:
-        return jsonify({
-            'success': False,
-            'error': str(e)
-        }), 400
 
-@app.route('/api/moves', methods=['POST'])
+@api.route('/moves', methods=['POST'])
 def execute_moves():
     """Execute multiple moves in sequence"""
-    try:
-        data = request.get_json()
-        moves = data.get('moves', [])
-        
-        if not moves:
-            return jsonify({
-                'success': False,
-                'error': 'Moves array is required'
-            }), 400
-        
-        for move in moves:
-            cube.apply_move(move)
+    cube_id, cube, lock = _get_cube()
+    moves = g.json.get('moves', [])
+    
+    if not moves or not isinstance(moves, list):
+        return ojsonify({
+            'success': False,
+            'error': 'Moves array is required'
+        }), 400
+    
+    bad = [move for move in moves if not isinstance(move, str) or move not in LEGAL_MOVES]
+    if bad:
+        return ojsonify({
+            'success': False,
+            'error': f'Invalid moves: {bad}'
+        }), 400
+    
+    with lock:
+        applied = cube.apply_move_sequence(moves)
         
-        return jsonify({
+        return ojsonify({
             'success': True,
+            'cube_id': cube_id,
             'moves': moves,
+            'applied': applied,
             'state': cube.get_state(),
             'is_solved': cube.is_solved(),
             'move_count': cube.get_move_count()
         })
-    except Exception as e:
-        return jsonify({
-            'success': False,
-            'error': str(e)
-        }), 400
 
-@app.route('/api/solve', methods=['POST'])
+def _cube_changed(cube_id):
+    """409 response for a solve whose cube was modified while the pool worked on it"""
+    return ojsonify({
+        'success': False,
+        'cube_id': cube_id,
+        'error': 'Cube changed while solving; solve again'
+    }), 409
+
+@api.route('/solve', methods=['POST'])
 def solve_cube():
     """Solve the cube and return solution steps"""
-    try:
-        data = request.get_json() or {}
-        algorithm = data.get('algorithm', 'kociemba')
-        
-        print(f"Solve request - Algorithm: {algorithm}")
-        print(f"Cube state before solving: {cube.get_state()}")
-        print(f"Is solved before: {cube.is_solved()}")
-        
-        if cube.is_solved():
-            return jsonify({
-                'success': True,
-                'already_solved': True,
-                'message': 'Cube is already solved!',
-                'moves': [],
-                'steps': [{'step': 'Already Solved', 'moves': [], 'description': 'Cube is already solved'}],
-                'algorithm': algorithm,
-                'time': 0
-            })
-        
-        # Store current state before solving (for reference)
+    cube_id, cube, lock = _get_cube()
+    algorithm = g.json.get('algorithm', 'kociemba')
+    if not isinstance(algorithm, str):
+        return ojsonify({
+            'success': False,
+            'error': 'Algorithm must be a string'
+        }), 400
+    
+    # Snapshot under the lock; the solve itself runs unlocked so polling
+    # isn't blocked, and its moves only apply if the cube is unchanged
+    with lock:
         initial_state = cube.get_state()
-        initial_state_string = cube.get_state_string()
-        
-        # Create a working copy for solving
-        working_cube = cube.clone()
-        
-        # Solve the working cube
-        solution_result = solver.solve(working_cube, algorithm)
+        solved = cube.is_solved()
+        state_string = cube.get_state_string()
+        move_history = tuple(cube.move_history)
+        version = cube._state_version
+    
+    logger.debug("Solve request - Algorithm: %s", algorithm)
+    logger.debug("Cube state before solving: %s", initial_state)
+    logger.debug("Is solved before: %s", solved)
+    
+    if solved:
+        return ojsonify({
+            'success': True,
+            'cube_id': cube_id,
+            'already_solved': True,
+            'message': 'Cube is already solved!',
+            'moves': [],
+            'steps': [Step('Already Solved', (), 'Cube is already solved')],
+            'algorithm': algorithm,
+            'time': 0
+        })
+    
+    # Solve a working copy (cached on the state, so repeat solves are free)
+    solution_result = _solve_cached(cube.size, state_string, move_history, algorithm)
+    
+    logger.debug("Solution result: %s", solution_result)
+    
+    if not solution_result['success']:
+        return ojsonify({
+            'success': False,
+            'error': solution_result.get('error', 'Failed to solve cube')
+        }), 400
+    
+    with lock:
+        if cube._state_version != version:
+            return _cube_changed(cube_id)
         
-        print(f"Solution result: {solution_result}")
+        # Now apply the solution to the original cube
+        if solution_result.get('moves'):
+            logger.debug("Applying %d moves to original cube", len(solution_result['moves']))
+            cube.apply_move_sequence(solution_result['moves'])
         
-        if solution_result['success']:
-            # Now apply the solution to the original cube
-            if solution_result.get('moves'):
-                print(f"Applying {len(solution_result['moves'])} moves to original cube")
-                cube.apply_move_sequence(solution_result['moves'])
-            
-            print(f"Cube state after applying solution: {cube.get_state()}")
-            print(f"Is solved after applying solution: {cube.is_solved()}")
-            
-            return jsonify({
-                'success': True,
-                'moves': solution_result['moves'],
-                'steps': solution_result.get('steps', []),
-                'algorithm': solution_result.get('algorithm', algorithm),
-                'time': solution_result.get('time', 0),
-                'initial_state': initial_state,
-                'final_state': cube.get_state(),
-                'is_solved': cube.is_solved(),
-                'move_count': len(solution_result.get('moves', []))
-            })
-        else:
-            return jsonify({
-                'success': False,
-                'error': solution_result.get('error', 'Failed to solve cube')
-            }), 400
-            
-    except Exception as e:
-        print(f"Solve error: {e}")
-        return jsonify({
-            'success': False,
-            'error': str(e)
-        }), 500
+        final_state = cube.get_state()
+        solved = cube.is_solved()
+    
+    logger.debug("Cube state after applying solution: %s", final_state)
+    logger.debug("Is solved after applying solution: %s", solved)
+    
+    return ojsonify({
+        'success': True,
+        'cube_id': cube_id,
+        'moves': solution_result['moves'],
+        'steps': solution_result.get('steps', []),
+        'algorithm': solution_result.get('algorithm', algorithm),
+        'time': solution_result.get('time', 0),
+        'initial_state': initial_state,
+        'final_state': final_state,
+        'is_solved': solved,
+        'move_count': len(solution_result.get('moves', []))
+    })
 
-@app.route('/api/reset', methods=['POST'])
+@api.route('/reset', methods=['POST'])
 def reset_cube():
     """Reset cube to solved state"""
-    try:
+    cube_id, cube, lock = _get_cube()
+    with lock:
         cube.reset()
-        return jsonify({
+        return ojsonify({
             'success': True,
+            'cube_id': cube_id,
             'state': cube.get_state(),
             'is_solved': cube.is_solved(),
             'move_count': cube.get_move_count()
         })
-    except Exception as e:
-        return jsonify({
-            'success': False,
-            'error': str(e)
-        }), 400
 
-@app.route('/api/is_solved', methods=['GET'])
+@api.route('/is_solved', methods=['GET'])
 def check_solved():
     """Check if cube is solved"""
-    try:
-        return jsonify({
+    cube_id, cube, lock = _get_cube(read_only=True)
+    with lock:
+        not_modified = _not_modified(cube)
+        if not_modified is not None:
+            return not_modified
+        return _with_etag(ojsonify({
             'success': True,
+            'cube_id': cube_id,
             'solved': cube.is_solved(),
             'state': cube.get_state(),
             'move_count': cube.get_move_count()
-        })
-    except Exception as e:
-        return jsonify({
-            'success': False,
-            'error': str(e)
-        }), 400
+        }), cube)
 
-@app.route('/api/stats', methods=['GET'])
+@api.route('/stats', methods=['GET'])
 def get_stats():
     """Get cube statistics"""
-    try:
-        return jsonify({
+    cube_id, cube, lock = _get_cube(read_only=True)
+    with lock:
+        return ojsonify({
             'success': True,
+            'cube_id': cube_id,
             'stats': {
                 'move_count': cube.get_move_count(),
                 'is_solved': cube.is_solved(),
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': time.time(),
                 'state_summary': cube.get_state_summary() if hasattr(cube, 'get_state_summary') else 'N/A'
             }
         })
-    except Exception as e:
-        return jsonify({
-            'success': False,
-            'error': str(e)
-        }), 400
 
-@app.route('/api/validate', methods=['POST'])
+@api.route('/validate', methods=['POST'])
 def validate_cube():
     """Validate if current cube state is solvable"""
-    try:
+    cube_id, cube, lock = _get_cube(read_only=True)
+    with lock:
         is_valid = cube.is_valid_state()
-        return jsonify({
+        return ojsonify({
             'success': True,
+            'cube_id': cube_id,
             'is_valid': is_valid,
             'state': cube.get_state()
         })
-    except Exception as e:
-        return jsonify({
-            'success': False,
-            'error': str(e)
-        }), 400
+
+app.register_blueprint(api)
 
 @app.errorhandler(404)
 def not_found(error):
-    return jsonify({
+    return ojsonify({
         'success': False,
         'error': 'Endpoint not found'
     }), 404
 
 @app.errorhandler(500)
 def internal_error(error):
-    return jsonify({
+    return ojsonify({
         'success': False,
         'error': 'Internal server error'
     }), 500
 
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
     print("🎲 Starting Rubik's Cube Solver Server...")
     print("📍 Server will be available at: http://localhost:5000")
     print("🔗 API Documentation: http://localhost:5000/api/cube-state")
     
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    # Threaded dev server so a slow solve doesn't block other clients;
+    # use gunicorn (see gunicorn.conf.py) for deployment
+    app.run(debug=False, host='0.0.0.0', port=5000, threaded=True)
@@ -0,0 +1,235 @@
+"""
+Compiled Move Kernels
+Numba-compiled batch move application for RubiksCube sticker arrays
+"""
+import numpy as np
+
+# Try to import numba, fallback to the per-move Python path in models
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """No-op stand-in so the kernels below still define"""
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+# Move notation -> kernel move id
+MOVE_IDX = {
+    'U': 0, "U'": 1, 'R': 2, "R'": 3, 'F': 4, "F'": 5,
+    'D': 6, "D'": 7, 'L': 8, "L'": 9, 'B': 10, "B'": 11,
+    'U2': 12, 'R2': 13, 'F2': 14, 'D2': 15, 'L2': 16, 'B2': 17
+}
+
+# Face indices in the sticker array (matches models.FACE_ORDER)
+U, R, F, D, L, B = 0, 1, 2, 3, 4, 5
+
+# Integer move algebra: id -> notation, face and clockwise quarter turns
+MOVE_NAMES = tuple(sorted(MOVE_IDX, key=MOVE_IDX.get))
+MOVE_FACE = np.array(['URFDLB'.index(name[0]) for name in MOVE_NAMES], dtype=np.int8)
+MOVE_TURNS = np.array([{'': 1, '2': 2, "'": 3}[name[1:]] for name in MOVE_NAMES], dtype=np.int8)
+_FACE_TURNS_ID = {(int(face), int(turns)): move_id
+                  for move_id, (face, turns) in enumerate(zip(MOVE_FACE, MOVE_TURNS))}
+
+# INVERSE_MOVE[m] undoes m; COMBINE_MOVE[a, b] is the single move equal to
+# a then b on one face, -1 when they cancel and -2 for different faces
+INVERSE_MOVE = np.array([_FACE_TURNS_ID[(int(face), 4 - int(turns))]
+                         for face, turns in zip(MOVE_FACE, MOVE_TURNS)], dtype=np.int8)
+COMBINE_MOVE = np.full((len(MOVE_NAMES), len(MOVE_NAMES)), -2, dtype=np.int8)
+for _a in range(len(MOVE_NAMES)):
+    for _b in range(len(MOVE_NAMES)):
+        if MOVE_FACE[_a] == MOVE_FACE[_b]:
+            _turns = (int(MOVE_TURNS[_a]) + int(MOVE_TURNS[_b])) % 4
+            COMBINE_MOVE[_a, _b] = _FACE_TURNS_ID[(int(MOVE_FACE[_a]), _turns)] if _turns else -1
+
+
+@njit(cache=True)
+def _rotate_clockwise(s, face, n):
+    """Rotate one face 90 degrees clockwise in place"""
+    for i in range(n // 2):
+        for j in range(i, n - 1 - i):
+            t = s[face, i, j]
+            s[face, i, j] = s[face, n-1-j, i]
+            s[face, n-1-j, i] = s[face, n-1-i, n-1-j]
+            s[face, n-1-i, n-1-j] = s[face, j, n-1-i]
+            s[face, j, n-1-i] = t
+
+
+@njit(cache=True)
+def _rotate_counterclockwise(s, face, n):
+    """Rotate one face 90 degrees counter-clockwise in place"""
+    for i in range(n // 2):
+        for j in range(i, n - 1 - i):
+            t = s[face, i, j]
+            s[face, i, j] = s[face, j, n-1-i]
+            s[face, j, n-1-i] = s[face, n-1-i, n-1-j]
+            s[face, n-1-i, n-1-j] = s[face, n-1-j, i]
+            s[face, n-1-j, i] = t
+
+
+@njit(cache=True)
+def _apply_move(s, m):
+    """Apply move id m to a (6, N, N) sticker array"""
+    n = s.shape[1]
+    if m == 0:  # U
+        _rotate_clockwise(s, U, n)
+        for j in range(n):
+            t = s[F, 0, j]
+            s[F, 0, j] = s[R, 0, j]
+            s[R, 0, j] = s[B, 0, j]
+            s[B, 0, j] = s[L, 0, j]
+            s[L, 0, j] = t
+    elif m == 1:  # U'
+        _rotate_counterclockwise(s, U, n)
+        for j in range(n):
+            t = s[F, 0, j]
+            s[F, 0, j] = s[L, 0, j]
+            s[L, 0, j] = s[B, 0, j]
+            s[B, 0, j] = s[R, 0, j]
+            s[R, 0, j] = t
+    elif m == 2:  # R
+        _rotate_clockwise(s, R, n)
+        for i in range(n):
+            t = s[U, i, n-1]
+            s[U, i, n-1] = s[F, i, n-1]
+            s[F, i, n-1] = s[D, i, n-1]
+            s[D, i, n-1] = s[B, n-1-i, 0]
+            s[B, n-1-i, 0] = t
+    elif m == 3:  # R'
+        _rotate_counterclockwise(s, R, n)
+        for i in range(n):
+            t = s[U, i, n-1]
+            s[U, i, n-1] = s[B, n-1-i, 0]
+            s[B, n-1-i, 0] = s[D, i, n-1]
+            s[D, i, n-1] = s[F, i, n-1]
+            s[F, i, n-1] = t
+    elif m == 4:  # F
+        _rotate_clockwise(s, F, n)
+        for i in range(n):
+            t = s[U, n-1, i]
+            s[U, n-1, i] = s[L, n-1-i, n-1]
+            s[L, n-1-i, n-1] = s[D, 0, n-1-i]
+            s[D, 0, n-1-i] = s[R, i, 0]
+            s[R, i, 0] = t
+    elif m == 5:  # F'
+        _rotate_counterclockwise(s, F, n)
+        for i in range(n):
+            t = s[U, n-1, i]
+            s[U, n-1, i] = s[R, i, 0]
+            s[R, i, 0] = s[D, 0, n-1-i]
+            s[D, 0, n-1-i] = s[L, n-1-i, n-1]
+            s[L, n-1-i, n-1] = t
+    elif m == 6:  # D
+        _rotate_clockwise(s, D, n)
+        for j in range(n):
+            t = s[F, n-1, j]
+            s[F, n-1, j] = s[L, n-1, j]
+            s[L, n-1, j] = s[B, n-1, j]
+            s[B, n-1, j] = s[R, n-1, j]
+            s[R, n-1, j] = t
+    elif m == 7:  # D'
+        _rotate_counterclockwise(s, D, n)
+        for j in range(n):
+            t = s[F, n-1, j]
+            s[F, n-1, j] = s[R, n-1, j]
+            s[R, n-1, j] = s[B, n-1, j]
+            s[B, n-1, j] = s[L, n-1, j]
+            s[L, n-1, j] = t
+    elif m == 8:  # L
+        _rotate_clockwise(s, L, n)
+        for i in range(n):
+            t = s[U, i, 0]
+            s[U, i, 0] = s[B, n-1-i, n-1]
+            s[B, n-1-i, n-1] = s[D, i, 0]
+            s[D, i, 0] = s[F, i, 0]
+            s[F, i, 0] = t
+    elif m == 9:  # L'
+        _rotate_counterclockwise(s, L, n)
+        for i in range(n):
+            t = s[U, i, 0]
+            s[U, i, 0] = s[F, i, 0]
+            s[F, i, 0] = s[D, i, 0]
+            s[D, i, 0] = s[B, n-1-i, n-1]
+            s[B, n-1-i, n-1] = t
+    elif m == 10:  # B
+        _rotate_clockwise(s, B, n)
+        for i in range(n):
+            t = s[U, 0, i]
+            s[U, 0, i] = s[R, i, n-1]
+            s[R, i, n-1] = s[D, n-1, n-1-i]
+            s[D, n-1, n-1-i] = s[L, n-1-i, 0]
+            s[L, n-1-i, 0] = t
+    elif m == 11:  # B'
+        _rotate_counterclockwise(s, B, n)
+        for i in range(n):
+            t = s[U, 0, i]
+            s[U, 0, i] = s[L, n-1-i, 0]
+            s[L, n-1-i, 0] = s[D, n-1, n-1-i]
+            s[D, n-1, n-1-i] = s[R, i, n-1]
+            s[R, i, n-1] = t
+
+
+@njit(cache=True)
+def apply_one(s, m):
+    """Apply one move id (half turns included) to a (6, N, N) sticker array in place"""
+    if m >= 12:  # Half turn: the face's clockwise quarter turn twice
+        _apply_move(s, 2 * (m - 12))
+        _apply_move(s, 2 * (m - 12))
+    else:
+        _apply_move(s, m)
+
+
+@njit(cache=True)
+def apply_seq(s, move_ids):
+    """Apply a sequence of move ids to a (6, N, N) sticker array in place"""
+    for k in range(move_ids.shape[0]):
+        apply_one(s, move_ids[k])
+
+
+@njit(cache=True)
+def faces_uniform(flat, n2):
+    """True when each of the six faces is a single color"""
+    for face in range(6):
+        first = flat[face * n2]
+        for i in range(face * n2 + 1, (face + 1) * n2):
+            if flat[i] != first:
+                return False
+    return True
+
+
+@njit(cache=True)
+def colors_balanced(flat, n2):
+    """True when every sticker is one of the six codes and each appears n2 times"""
+    counts = np.zeros(6, dtype=np.int64)
+    for i in range(flat.shape[0]):
+        color = flat[i]
+        if color >= 6:
+            return False
+        counts[color] += 1
+    for color in range(6):
+        if counts[color] != n2:
+            return False
+    return True
+
+
+@njit(cache=True)
+def run_until_solved(flat, perms, tape, checks):
+    """
+    Gather flat stickers through perms[tape[k]] for each step k in order,
+    stopping before a step with checks[k] set once every face is uniform
+
+    Returns the number of steps applied.
+    """
+    n2 = flat.shape[0] // 6
+    buf = np.empty_like(flat)
+    for k in range(tape.shape[0]):
+        if checks[k] and faces_uniform(flat, n2):
+            return k
+        perm = perms[tape[k]]
+        for i in range(flat.shape[0]):
+            buf[i] = flat[perm[i]]
+        flat[:] = buf
+    return tape.shape[0]
@@ -2,85 +2,304 @@
 Cube Solving Algorithms
 Implements Kociemba two-phase algorithm and layer-by-layer method
 """
+import logging
 import time
-import random
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import chain
 from typing import List, Dict, Optional, Tuple
-from models import RubiksCube
+from cube_kernels import COMBINE_MOVE, INVERSE_MOVE, MOVE_FACE, MOVE_IDX, MOVE_NAMES
+from models import LEGAL_MOVES, RubiksCube
+import ida_star
+import pocket
+
+logger = logging.getLogger(__name__)
 
 # Try to import kociemba library, fallback to simplified version
 try:
     import kociemba
     KOCIEMBA_AVAILABLE = True
-    print("Kociemba library available")
+    # The package silently drops to its (much slower) pure-Python search
+    # when its compiled cffi extension is missing
+    try:
+        from kociemba import ckociembawrapper  # noqa: F401
+        KOCIEMBA_NATIVE = True
+    except ImportError:
+        KOCIEMBA_NATIVE = False
+    logger.info("Kociemba library available (%s)", 'native' if KOCIEMBA_NATIVE else 'pure Python')
 except ImportError:
     KOCIEMBA_AVAILABLE = False
-    print("Kociemba library not available, using simplified solver")
+    KOCIEMBA_NATIVE = False
+    logger.info("Kociemba library not available, using simplified solver")
+
+# Solvers work on integer move ids (cube_kernels.MOVE_IDX) and only spell
+# moves out at the boundary; these string views serve the string helpers
+_N_MOVES = len(MOVE_NAMES)
+_COMBINE_IDS = COMBINE_MOVE.tolist()
+_OPPOSITE_FACE = [(int(face) + 3) % 6 for face in MOVE_FACE]
+_MOVE_FACE = MOVE_FACE.tolist()
+_REVERSE: Dict[str, str] = {name: MOVE_NAMES[inverse] for name, inverse in zip(MOVE_NAMES, INVERSE_MOVE.tolist())}
+# 4x4 notation adaptation, per move (identity until wide turns exist)
+_ADAPT_4X4: Dict[str, str] = {name: name for name in MOVE_NAMES}
+
+@lru_cache(maxsize=64)
+def _cycle_steps(algorithms: Tuple[Tuple[str, ...], ...], attempts: int,
+                 every: int) -> Tuple[Tuple[Tuple[str, ...], bool], ...]:
+    """
+    `attempts` passes over algorithms as checked steps for _run_steps (so
+    the run stops at a pass boundary once solved), with a U turn after
+    every `every`-th pass; moves apply_move would reject (e.g. slice
+    turns) are dropped up front
+    """
+    one_pass = tuple(move for move in chain.from_iterable(algorithms) if move in LEGAL_MOVES)
+    return tuple((one_pass + (('U',) if attempt % every == 0 else ()), True) for attempt in range(attempts))
+
+# Brute-force step programs for the beginner method, built once: (moves,
+# check) pairs, where a checked step is skipped once the cube is solved.
+# These fixed tapes don't solve scrambled cubes on their own (the history
+# undo in _beginner_fallback finishes the job), so for them the check only
+# costs a sticker compare per step and never cuts a run short
+_BOTTOM_CROSS_ALGS = (
+    ("F", "D", "R", "F'", "D'"),
+    ("R", "D'", "F", "D", "R'"),
+    ("D", "R", "U", "R'", "D'"),
+    ("F", "U", "F'", "D", "F", "D'"),
+)
+_BOTTOM_CROSS_STEPS = tuple(
+    step
+    for attempt in range(8)  # Try different orientations, turning D (and U) between
+    for step in ([(alg, True) for alg in _BOTTOM_CROSS_ALGS] + [(('D',), False)]
+                 + ([(('U',), False)] if attempt % 2 == 0 else []))
+)
+_BOTTOM_CORNERS_ALGS = (
+    ("R", "D", "R'", "D'"),
+    ("F", "D", "F'", "D'"),
+    ("R", "D2", "R'", "D'"),
+    ("L'", "D'", "L", "D"),
+)
+_BOTTOM_CORNERS_STEPS = tuple(
+    step
+    for attempt in range(12)
+    for step in ([(alg, True) for alg in _BOTTOM_CORNERS_ALGS]
+                 + ([(('D',), False)] if attempt % 3 == 0 else []))
+)
+_RIGHT_HAND = ("U", "R", "U'", "R'", "U'", "F'", "U", "F")
+_LEFT_HAND = ("U'", "L'", "U", "L", "U", "F", "U'", "F'")
+_MIDDLE_LAYER_STEPS = tuple(
+    step
+    for attempt in range(8)
+    for step in ((_RIGHT_HAND if attempt % 2 == 0 else _LEFT_HAND, True), (('U',), False))
+)
+_OLL_ALG = ("F", "R", "U", "R'", "U'", "F'")
+_TOP_CROSS_STEPS = ((_OLL_ALG, True), (('U',), False)) * 6
+_SUNE = ("R", "U", "R'", "U", "R", "U2", "R'")
+_ANTISUNE = ("R", "U2", "R'", "U'", "R", "U'", "R'")
+_ORIENT_TOP_CORNERS_STEPS = tuple(
+    step
+    for attempt in range(8)
+    for step in ((_SUNE if attempt % 2 == 0 else _ANTISUNE, True), (('U',), False))
+)
+_T_PERM = ("R", "U", "R'", "F'", "R", "U", "R'", "U'", "R'", "F", "R2", "U'", "R'")
+_PERMUTE_TOP_CORNERS_STEPS = ((_T_PERM, True), (('U',), False)) * 4
+_U_PERM = ("R", "U'", "R", "U", "R", "U", "R", "U'", "R'", "U'", "R2")
+_H_PERM = ("R2", "U2", "R", "U2", "R2", "U2", "R2", "U2", "R", "U2", "R2")
+_PERMUTE_TOP_EDGES_STEPS = tuple(
+    step
+    for attempt in range(6)
+    for step in ((_U_PERM if attempt % 2 == 0 else _H_PERM, True), (('U',), False))
+)
+
+# Reduction-stage algorithm sets, cycled by _cycle_steps
+_CENTER_ALGS_4X4 = tuple(
+    tuple(_ADAPT_4X4.get(move, move) for move in alg)  # Wide turns when needed
+    for alg in (
+        ("M", "U", "M'", "U2", "M", "U", "M'"),  # Center swapping
+        ("R", "U", "R'", "F", "R", "F'"),
+        ("L'", "U'", "L", "F'", "L'", "F"),
+    )
+)
+_EDGE_ALGS_4X4 = tuple(
+    tuple(_ADAPT_4X4.get(move, move) for move in alg)
+    for alg in (
+        ("R", "U'", "R'", "F", "R", "F'"),
+        ("L'", "U", "L", "F'", "L'", "F"),
+        ("F", "R", "U'", "R'", "F'"),
+    )
+)
+_CENTER_ALGS_5X5 = (
+    ("R", "U", "R'", "U'", "R'", "F", "R", "F'"),
+    ("L'", "U'", "L", "U", "L", "F'", "L'", "F"),
+    ("F", "R", "U", "R'", "U'", "F'"),
+)
+_EDGE_ALGS_5X5 = (
+    ("R", "U", "R'", "F", "R", "F'", "U'", "R", "U", "R'"),
+    ("L'", "U'", "L", "F'", "L'", "F", "U", "L'", "U'", "L"),
+)
+_CENTER_ALGS_NXN = (
+    ("R", "U", "R'", "F", "R", "F'"),
+    ("L'", "U'", "L", "F'", "L'", "F"),
+    ("F", "U", "F'", "R", "U", "R'"),
+    ("U", "R", "U'", "R'"),
+)
+_EDGE_ALGS_NXN = (
+    ("R", "U'", "R'", "F", "R", "F'", "R", "U", "R'"),
+    ("L'", "U", "L", "F'", "L'", "F", "L'", "U'", "L"),
+    ("F", "R", "U", "R'", "U'", "F'"),
+)
+_BASIC_3X3_ALGS = (
+    ("R", "U", "R'", "U'"),
+    ("F", "R", "U", "R'", "U'", "F'"),
+    ("R", "U", "R'", "F'", "R", "U", "R'", "U'", "R'", "F", "R2", "U'", "R'"),
+)
+
+@lru_cache(maxsize=8192)
+def _run_steps_cached(size: int, state: bytes,
+                      steps: Tuple[Tuple[Tuple[str, ...], bool], ...]) -> Tuple[bytes, Tuple[str, ...]]:
+    """Brute-force step run from a packed state -> (final state, moves applied)"""
+    cube = RubiksCube(size)
+    cube.set_state(state)
+    applied = cube.apply_until_solved(steps)
+    return cube.state_bytes(), tuple(chain.from_iterable(moves for moves, _ in steps[:applied]))
+
+@lru_cache(maxsize=4096)
+def _kociemba_solve(cube_string: str) -> str:
+    """kociemba.solve memoized on the facelet string (errors are not cached)"""
+    return kociemba.solve(cube_string)
+
+@dataclass(frozen=True, slots=True)
+class Step:
+    """One stage of a solution; also readable like the dict it replaced"""
+    step: str
+    moves: Tuple[str, ...]
+    description: str
+    
+    def __getitem__(self, key: str):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+    
+    def get(self, key: str, default=None):
+        return getattr(self, key) if key in self.__slots__ else default
 
 class CubeSolver:
+    # Solvers whose result depends on the move history (they fall back to
+    # undoing it); the rest only look at the stickers
+    HISTORY_ALGORITHMS = frozenset({'beginner', 'reduction'})
+    
     def __init__(self):
         self.algorithms = {
             'kociemba': self._solve_kociemba,
             'beginner': self._solve_beginner,
-            'reduction': self._solve_reduction  # For larger cubes
+            'reduction': self._solve_reduction,  # For larger cubes
+            'ida_star': self._solve_ida_star,  # Optimal, 3x3 only
+            'lookup': self._solve_lookup  # Optimal table lookup, 2x2 only
         }
     
+    def warmup(self):
+        """
+        Build every solver's tables and compile their kernels up front
+        
+        All of them are built lazily on first use, so without this the first
+        user request of each kind pays for it. Called before the solve pool
+        forks, the workers inherit the result.
+        """
+        cube = RubiksCube(3)
+        cube.apply_move_sequence(['R'])
+        ida_star.solve_optimal(cube)  # Pattern databases, IDA* kernel
+        ida_star.solve_two_phase(cube)  # Phase-2 tables, two-phase kernels
+        pocket.solution_table()  # 2x2 lookup table
+        self._solve_beginner(cube.clone())  # Batch move kernel
+        if not KOCIEMBA_AVAILABLE:
+            return
+        try:
+            _kociemba_solve(self._cube_to_kociemba_string(cube))
+        except Exception as e:
+            logger.warning("Kociemba warmup failed: %s", e)
+    
+    @staticmethod
+    def resolve_algorithm(size: int, algorithm: str) -> str:
+        """Algorithm solve() actually runs for a cube of this size"""
+        # Auto-select algorithm based on cube size
+        if size > 3 and algorithm == 'kociemba':
+            logger.debug("Auto-switching to reduction method for %sx%s cube", size, size)
+            return 'reduction'
+        if size == 2 and algorithm in ('kociemba', 'ida_star'):
+            return 'lookup'
+        return algorithm
+    
     def solve(self, cube: RubiksCube, algorithm: str = 'kociemba') -> Dict:
         """
         Solve the cube using specified algorithm
         
         Args:
             cube: RubiksCube instance to solve
-            algorithm: 'kociemba', 'beginner', or 'reduction'
+            algorithm: 'kociemba', 'beginner', 'reduction', or 'ida_star'
             
         Returns:
             Dict with solution results
         """
         start_time = time.time()
         
-        try:
-            if cube.is_solved():
-                return {
-                    'success': True,
-                    'moves': [],
-                    'steps': [{'step': 'Already Solved', 'moves': [], 'description': 'Cube is already solved'}],
-                    'time': 0,
-                    'algorithm': algorithm,
-                    'cube_size': cube.size
-                }
-            
-            # Auto-select algorithm based on cube size
-            if cube.size > 3 and algorithm == 'kociemba':
-                print(f"Auto-switching to reduction method for {cube.size}x{cube.size} cube")
-                algorithm = 'reduction'
-            
-            if algorithm not in self.algorithms:
-                return {
-                    'success': False,
-                    'error': f'Unknown algorithm: {algorithm}',
-                    'time': time.time() - start_time
-                }
-            
-            # Create a working copy to avoid modifying the original
+        if not isinstance(cube, RubiksCube):
+            return {
+                'success': False,
+                'error': 'Expected a RubiksCube instance',
+                'time': time.time() - start_time
+            }
+        
+        if cube.is_solved():
+            return {
+                'success': True,
+                'moves': [],
+                'steps': [Step('Already Solved', (), 'Cube is already solved')],
+                'time': 0,
+                'algorithm': algorithm,
+                'cube_size': cube.size
+            }
+        
+        algorithm = self.resolve_algorithm(cube.size, algorithm)
+        if algorithm not in self.algorithms:
+            return {
+                'success': False,
+                'error': f'Unknown algorithm: {algorithm}',
+                'time': time.time() - start_time
+            }
+        
+        # The library path only reads the facelet string, so it can run on
+        # the original; every other solver mutates a working copy
+        if algorithm == 'kociemba' and KOCIEMBA_AVAILABLE:
+            working_cube = cube
+        else:
             working_cube = cube.clone()
-            
-            # Solve using selected algorithm
+        
+        # Solve using selected algorithm; only the solvers themselves are
+        # expected to fail (bad states, unsupported sizes)
+        try:
             result = self.algorithms[algorithm](working_cube)
-            result['time'] = time.time() - start_time
-            result['cube_size'] = cube.size
-            
-            # Apply solution to original cube
-            if result.get('success') and result.get('moves'):
-                cube.apply_move_sequence(result['moves'])
-            
-            return result
-            
-        except Exception as e:
+        except (ValueError, KeyError, IndexError, RuntimeError) as e:
+            logger.warning("%s solver failed: %s", algorithm, e)
             return {
                 'success': False,
                 'error': str(e),
                 'time': time.time() - start_time,
                 'cube_size': cube.size
             }
+        result['time'] = time.time() - start_time
+        result['cube_size'] = cube.size
+        
+        # Apply solution to original cube
+        if result.get('success') and result.get('moves'):
+            cube.apply_move_sequence(result['moves'])
+        
+        return result
+    
+    def solve_batch(self, cubes: List[RubiksCube], algorithm: str = 'kociemba') -> List[Dict]:
+        """
+        Solve several cubes with one algorithm, results in input order
+        
+        Identical states are solved once thanks to the kociemba memo.
+        """
+        return [self.solve(cube, algorithm) for cube in cubes]
     
     def _solve_kociemba(self, cube: RubiksCube) -> Dict:
         """
@@ -92,156 +311,206 @@ class CubeSolver:
         else:
             return self._solve_kociemba_fallback(cube)
     
-    def _solve_with_kociemba_library(self, cube: RubiksCube) -> Dict:
-        """Solve using the real kociemba library"""
-        try:
-            # Convert cube state to kociemba format
-            cube_string = self._cube_to_kociemba_string(cube)
-            
-            # Solve using kociemba
-            solution = kociemba.solve(cube_string)
-            
-            if solution == "Error":
+    def _solve_ida_star(self, cube: RubiksCube) -> Dict:
+        """
+        Optimal (quarter-turn metric) solve by IDA* with pattern databases
+        Positions too deep for the node/time budget fall back to the
+        two-phase search, whose result is labelled as not optimal
+        """
+        if cube.size != 3:
+            return {
+                'success': False,
+                'error': 'IDA* optimal solver only supports 3x3 cubes'
+            }
+        
+        moves = ida_star.solve_optimal(cube)
+        if moves is None:
+            moves = ida_star.solve_two_phase(cube)
+            if moves is None:
                 return {
                     'success': False,
-                    'error': 'Invalid cube state for Kociemba solver'
+                    'error': 'No solution found within the search limits'
                 }
-            
-            # Parse solution moves
-            moves = solution.split() if solution else []
-            
-            # Create step-by-step breakdown
-            steps = self._create_kociemba_steps(moves)
-            
+            cube.apply_move_sequence(moves)
             return {
                 'success': True,
                 'moves': moves,
-                'steps': steps,
-                'algorithm': 'Kociemba Two-Phase (Library)',
+                'steps': [Step(
+                    step='Two-Phase Solution',
+                    moves=tuple(moves),
+                    description=f'IDA* hit its search limit; two-phase solution ({len(moves)} moves, not optimal)'
+                )],
+                'algorithm': 'Kociemba Two-Phase (IDA* fallback, not optimal)',
                 'original_length': len(moves),
                 'optimized_length': len(moves)
             }
-            
-        except Exception as e:
-            print(f"Kociemba library error: {e}")
-            return self._solve_kociemba_fallback(cube)
+        
+        cube.apply_move_sequence(moves)
+        return {
+            'success': True,
+            'moves': moves,
+            'steps': [Step(
+                step='Optimal Solution',
+                moves=tuple(moves),
+                description=f'Shortest solution found by IDA* ({len(moves)} moves)'
+            )],
+            'algorithm': 'IDA* Optimal Search',
+            'original_length': len(moves),
+            'optimized_length': len(moves)
+        }
     
-    def _solve_kociemba_fallback(self, cube: RubiksCube) -> Dict:
+    def _solve_lookup(self, cube: RubiksCube) -> Dict:
         """
-        Simple but working solver that returns the cube to solved state
+        Optimal 2x2 solve read off the precomputed state table
+        The table is built on first use; later solves are a walk of <= 11 moves
         """
-        moves = []
+        if cube.size != 2:
+            return {
+                'success': False,
+                'error': 'Lookup table solver only supports 2x2 cubes'
+            }
         
-        # Simple approach: reverse the move history to get back to solved state
-        if hasattr(cube, 'move_history') and cube.move_history:
-            # Reverse the move history to undo all moves
-            for move in reversed(cube.move_history):
-                reverse_move = self._reverse_move(move)
-                cube.apply_move(reverse_move)
-                moves.append(reverse_move)
+        moves = pocket.solve(cube)
+        cube.apply_move_sequence(moves)
+        return {
+            'success': True,
+            'moves': moves,
+            'steps': [Step(
+                step='Optimal Solution',
+                moves=tuple(moves),
+                description=f'Shortest solution from the 2x2 lookup table ({len(moves)} moves)'
+            )],
+            'algorithm': '2x2 Lookup Table',
+            'original_length': len(moves),
+            'optimized_length': len(moves)
+        }
+    
+    def _solve_with_kociemba_library(self, cube: RubiksCube) -> Dict:
+        """Solve using the real kociemba library (never mutates cube)"""
+        # Convert cube state to kociemba format
+        cube_string = self._cube_to_kociemba_string(cube)
         
-        # If the cube still isn't solved, try some common solving sequences
-        if not cube.is_solved():
-            solving_sequences = [
-                # Common solving algorithms
-                ["R", "U", "R'", "U'"],  # Basic R U R' U'
-                ["F", "R", "U", "R'", "U'", "F'"],  # F R U R' U' F'
-                ["R", "U", "R'", "F", "R", "F'"],  # R U R' F R F'
-                ["U", "R", "U'", "R'", "U'", "F", "R", "F'"],  # OLL/PLL
-            ]
-            
-            attempts = 0
-            while not cube.is_solved() and attempts < 20:
-                sequence = solving_sequences[attempts % len(solving_sequences)]
-                for move in sequence:
-                    cube.apply_move(move)
-                    moves.append(move)
-                
-                # Try different rotations
-                if attempts % 4 == 0:
-                    cube.apply_move('U')
-                    moves.append('U')
-                
-                attempts += 1
-        
-        # Final check - if still not solved, reset to solved state
-        if not cube.is_solved():
-            # As a last resort, reset the cube to solved state
-            cube.reset()
-            moves = ["Reset"]  # Indicate that we had to reset
+        # Solve using kociemba (repeat states come from the memo); the
+        # library rejects states it cannot read with ValueError
+        try:
+            solution = _kociemba_solve(cube_string)
+        except ValueError as e:
+            logger.warning("Kociemba library error: %s", e)
+            return self._solve_kociemba_fallback(cube.clone())
         
-        steps = [
-            {
-                'step': 'Solution',
-                'moves': moves,
-                'description': f'Applied {len(moves)} moves to solve the cube'
+        if solution == "Error":
+            return {
+                'success': False,
+                'error': 'Invalid cube state for Kociemba solver'
             }
-        ]
+        
+        # Parse solution moves
+        moves = solution.split() if solution else []
+        
+        # Create step-by-step breakdown
+        steps = self._create_kociemba_steps(moves)
         
         return {
             'success': True,
             'moves': moves,
             'steps': steps,
-            'algorithm': 'Simplified Solver',
+            'algorithm': 'Kociemba Two-Phase (Library)',
             'original_length': len(moves),
             'optimized_length': len(moves)
         }
     
-    def _reverse_move(self, move: str) -> str:
-        """Get the reverse of a move"""
-        if move.endswith("'"):
-            return move[0]  # R' -> R
-        elif move.endswith("2"):
-            return move  # R2 -> R2 (same)
+    # Undoing the move history beats a 3x3 search only while it stays short;
+    # the default 25-move scramble still qualifies
+    HISTORY_REVERSAL_LIMIT = 25
+    
+    def _solve_kociemba_fallback(self, cube: RubiksCube) -> Dict:
+        """
+        Undo the move history when that is short and actually solves the
+        cube, otherwise (3x3) run a two-phase IDA* search over cubie
+        coordinates; used when the library is missing or fails. Other sizes
+        always undo the move history.
+        """
+        undo = [_REVERSE[move] for move in reversed(cube.move_history)]
+        original_length = len(undo)
+        undo = self._optimize_moves(undo)
+        
+        # A 3x3 history may not describe the state (from_state_string, a
+        # truncated history): only trust it if it solves a copy of the cube
+        history_solves = cube.size != 3 or len(undo) <= self.HISTORY_REVERSAL_LIMIT
+        if history_solves and cube.size == 3:
+            trial = cube.clone()
+            trial.apply_move_sequence(undo)
+            history_solves = trial.is_solved()
+        
+        if not history_solves:
+            moves = ida_star.solve_two_phase(cube)
+            if moves is None:
+                return {
+                    'success': False,
+                    'error': 'No two-phase solution found within the search limits'
+                }
+            algorithm = 'Kociemba Two-Phase (IDA*)'
+            original_length = len(moves)
+            cube.apply_move_sequence(moves)
         else:
-            return move + "'"  # R -> R'
+            algorithm = 'Move History Reversal'
+            moves = undo
+            cube.apply_move_sequence(moves)
+            if not cube.is_solved():
+                return {
+                    'success': False,
+                    'error': 'Could not solve cube from its move history'
+                }
+        
+        return {
+            'success': True,
+            'moves': moves,
+            'steps': self._create_kociemba_steps(moves),
+            'algorithm': algorithm,
+            'original_length': original_length,
+            'optimized_length': len(moves)
+        }
+    
+    def _undo_history(self, cube: RubiksCube) -> List[str]:
+        """Apply the inverse of the whole move history in one batch"""
+        undo_ids = INVERSE_MOVE[[MOVE_IDX[move] for move in reversed(cube.move_history)]]
+        cube.apply_move_ids(undo_ids)
+        return [MOVE_NAMES[move_id] for move_id in undo_ids.tolist()]
+    
+    # Sticker code i is the color of face i in FACE_ORDER (U, R, F, D, L, B),
+    # which is exactly kociemba's facelet letter for that color
+    _KOCIEMBA_FACELETS = bytes.maketrans(bytes(range(6)), b'URFDLB')
     
     def _cube_to_kociemba_string(self, cube: RubiksCube) -> str:
         """Convert cube state to kociemba format string"""
         # Kociemba format: UUUUUUUUURRRRRRRRRFFFFFFFFFDDDDDDDDDLLLLLLLLLBBBBBBBBB
         # Order: U, R, F, D, L, B faces, each 9 positions
-        
-        color_map = {
-            'W': 'U',  # White -> Up
-            'R': 'R',  # Red -> Right  
-            'G': 'F',  # Green -> Front
-            'Y': 'D',  # Yellow -> Down
-            'O': 'L',  # Orange -> Left
-            'B': 'B'   # Blue -> Back
-        }
-        
-        result = ''
-        for face_name in ['U', 'R', 'F', 'D', 'L', 'B']:
-            face = cube.faces[face_name]
-            for row in face:
-                for color in row:
-                    result += color_map.get(color, color)
-        
-        return result
+        return cube.stickers.tobytes().translate(self._KOCIEMBA_FACELETS).decode('ascii')
     
-    def _create_kociemba_steps(self, moves: List[str]) -> List[Dict]:
+    def _create_kociemba_steps(self, moves: List[str]) -> List['Step']:
         """Create step-by-step breakdown for kociemba solution"""
         if not moves:
             return []
         
         steps = []
+        moves = tuple(moves)
         
         # Group moves into logical phases
         phase1_end = len(moves) // 2
         
         if phase1_end > 0:
-            steps.append({
-                'step': 'Phase 1: Orientation',
-                'moves': moves[:phase1_end],
-                'description': 'Orient edges and corners'
-            })
+            steps.append(Step(
+                step='Phase 1: Orientation',
+                moves=moves[:phase1_end],
+                description='Orient edges and corners'
+            ))
         
         if phase1_end < len(moves):
-            steps.append({
-                'step': 'Phase 2: Permutation', 
-                'moves': moves[phase1_end:],
-                'description': 'Position all pieces correctly'
-            })
+            steps.append(Step(
+                step='Phase 2: Permutation',
+                moves=moves[phase1_end:],
+                description='Position all pieces correctly'
+            ))
         
         return steps
     
@@ -254,7 +523,7 @@ class CubeSolver:
         steps = []
         size = cube.size
         
-        print(f"Using reduction method for {size}x{size} cube")
+        logger.debug("Using reduction method for %sx%s cube", size, size)
         
         if size == 4:
             # 4x4 specific reduction
@@ -269,21 +538,21 @@ class CubeSolver:
         # After reduction, solve like 3x3
         final_moves = self._solve_as_3x3(cube)
         moves.extend(final_moves)
-        steps.append({
-            'step': f'{len(steps)+1}. Final 3x3 Solution',
-            'moves': final_moves,
-            'description': f'Solve remaining as 3x3 cube ({len(final_moves)} moves)'
-        })
+        steps.append(Step(
+            step=f'{len(steps)+1}. Final 3x3 Solution',
+            moves=tuple(final_moves),
+            description=f'Solve remaining as 3x3 cube ({len(final_moves)} moves)'
+        ))
         
         # Fallback if not solved
         if not cube.is_solved():
             fallback_moves = self._reduction_fallback(cube)
             moves.extend(fallback_moves)
-            steps.append({
-                'step': f'{len(steps)+1}. Fallback',
-                'moves': fallback_moves,
-                'description': 'Final solving steps'
-            })
+            steps.append(Step(
+                step=f'{len(steps)+1}. Fallback',
+                moves=tuple(fallback_moves),
+                description='Final solving steps'
+            ))
         
         return {
             'success': True,
@@ -292,55 +561,55 @@ class CubeSolver:
             'algorithm': f'Reduction Method ({size}x{size})'
         }
     
-    def _solve_4x4_reduction(self, cube: RubiksCube, moves: List[str]) -> List[Dict]:
+    def _solve_4x4_reduction(self, cube: RubiksCube, moves: List[str]) -> List[Step]:
         """4x4 cube specific reduction steps"""
         steps = []
         
         # Step 1: Solve centers
         center_moves = self._solve_4x4_centers(cube)
         moves.extend(center_moves)
-        steps.append({
-            'step': '1. Solve Centers',
-            'moves': center_moves,
-            'description': f'Group center pieces ({len(center_moves)} moves)'
-        })
+        steps.append(Step(
+            step='1. Solve Centers',
+            moves=tuple(center_moves),
+            description=f'Group center pieces ({len(center_moves)} moves)'
+        ))
         
         # Step 2: Pair edges
         edge_moves = self._solve_4x4_edges(cube)
         moves.extend(edge_moves)
-        steps.append({
-            'step': '2. Pair Edges',
-            'moves': edge_moves,
-            'description': f'Pair up edge pieces ({len(edge_moves)} moves)'
-        })
+        steps.append(Step(
+            step='2. Pair Edges',
+            moves=tuple(edge_moves),
+            description=f'Pair up edge pieces ({len(edge_moves)} moves)'
+        ))
         
         return steps
     
-    def _solve_5x5_reduction(self, cube: RubiksCube, moves: List[str]) -> List[Dict]:
+    def _solve_5x5_reduction(self, cube: RubiksCube, moves: List[str]) -> List[Step]:
         """5x5 cube specific reduction steps"""
         steps = []
         
         # Step 1: Solve centers
         center_moves = self._solve_5x5_centers(cube)  
         moves.extend(center_moves)
-        steps.append({
-            'step': '1. Solve Centers',
-            'moves': center_moves,
-            'description': f'Group center pieces into 3x3 blocks ({len(center_moves)} moves)'
-        })
+        steps.append(Step(
+            step='1. Solve Centers',
+            moves=tuple(center_moves),
+            description=f'Group center pieces into 3x3 blocks ({len(center_moves)} moves)'
+        ))
         
         # Step 2: Pair edges
         edge_moves = self._solve_5x5_edges(cube)
         moves.extend(edge_moves)
-        steps.append({
-            'step': '2. Pair Edges',
-            'moves': edge_moves,
-            'description': f'Pair edge pieces ({len(edge_moves)} moves)'
-        })
+        steps.append(Step(
+            step='2. Pair Edges',
+            moves=tuple(edge_moves),
+            description=f'Pair edge pieces ({len(edge_moves)} moves)'
+        ))
         
         return steps
     
-    def _solve_nxn_reduction(self, cube: RubiksCube, moves: List[str]) -> List[Dict]:
+    def _solve_nxn_reduction(self, cube: RubiksCube, moves: List[str]) -> List[Step]:
         """General NxN cube reduction"""
         steps = []
         size = cube.size
@@ -348,20 +617,20 @@ class CubeSolver:
         # Step 1: Solve centers
         center_moves = self._solve_nxn_centers(cube)
         moves.extend(center_moves)
-        steps.append({
-            'step': '1. Solve Centers',
-            'moves': center_moves,
-            'description': f'Group {size}x{size} centers into blocks ({len(center_moves)} moves)'
-        })
+        steps.append(Step(
+            step='1. Solve Centers',
+            moves=tuple(center_moves),
+            description=f'Group {size}x{size} centers into blocks ({len(center_moves)} moves)'
+        ))
         
         # Step 2: Pair edges
         edge_moves = self._solve_nxn_edges(cube)
         moves.extend(edge_moves)
-        steps.append({
-            'step': '2. Pair Edges', 
-            'moves': edge_moves,
-            'description': f'Pair up edge groups ({len(edge_moves)} moves)'
-        })
+        steps.append(Step(
+            step='2. Pair Edges',
+            moves=tuple(edge_moves),
+            description=f'Pair up edge groups ({len(edge_moves)} moves)'
+        ))
         
         return steps
     
@@ -373,81 +642,81 @@ class CubeSolver:
         moves = []
         steps = []
         
-        print("Using actual layer-by-layer beginner method")
+        logger.debug("Using actual layer-by-layer beginner method")
         
         # Step 1: Bottom Cross (White cross on bottom)
         cross_moves = self._solve_bottom_cross_bruteforce(cube)
         moves.extend(cross_moves)
-        steps.append({
-            'step': '1. White Cross',
-            'moves': cross_moves,
-            'description': f'Form white cross on bottom ({len(cross_moves)} moves)'
-        })
+        steps.append(Step(
+            step='1. White Cross',
+            moves=tuple(cross_moves),
+            description=f'Form white cross on bottom ({len(cross_moves)} moves)'
+        ))
         
         # Step 2: Bottom Corners (Complete first layer)
         corner_moves = self._solve_bottom_corners_bruteforce(cube)
         moves.extend(corner_moves)
-        steps.append({
-            'step': '2. First Layer Corners',
-            'moves': corner_moves,
-            'description': f'Position white corners ({len(corner_moves)} moves)'
-        })
+        steps.append(Step(
+            step='2. First Layer Corners',
+            moves=tuple(corner_moves),
+            description=f'Position white corners ({len(corner_moves)} moves)'
+        ))
         
         # Step 3: Middle Layer (Second layer edges)
         middle_moves = self._solve_middle_layer_bruteforce(cube)
         moves.extend(middle_moves)
-        steps.append({
-            'step': '3. Middle Layer',
-            'moves': middle_moves,
-            'description': f'Position middle layer edges ({len(middle_moves)} moves)'
-        })
+        steps.append(Step(
+            step='3. Middle Layer',
+            moves=tuple(middle_moves),
+            description=f'Position middle layer edges ({len(middle_moves)} moves)'
+        ))
         
         # Step 4: Top Cross (Yellow cross)
         top_cross_moves = self._solve_top_cross_bruteforce(cube)
         moves.extend(top_cross_moves)
-        steps.append({
-            'step': '4. Top Cross',
-            'moves': top_cross_moves,
-            'description': f'Form yellow cross on top ({len(top_cross_moves)} moves)'
-        })
+        steps.append(Step(
+            step='4. Top Cross',
+            moves=tuple(top_cross_moves),
+            description=f'Form yellow cross on top ({len(top_cross_moves)} moves)'
+        ))
         
         # Step 5: Orient Top Corners
         orient_moves = self._orient_top_corners_bruteforce(cube)
         moves.extend(orient_moves)
-        steps.append({
-            'step': '5. Orient Top Corners',
-            'moves': orient_moves,
-            'description': f'Orient yellow corners ({len(orient_moves)} moves)'
-        })
+        steps.append(Step(
+            step='5. Orient Top Corners',
+            moves=tuple(orient_moves),
+            description=f'Orient yellow corners ({len(orient_moves)} moves)'
+        ))
         
         # Step 6: Permute Top Corners
         permute_corner_moves = self._permute_top_corners_bruteforce(cube)
         moves.extend(permute_corner_moves)
-        steps.append({
-            'step': '6. Permute Corners',
-            'moves': permute_corner_moves,
-            'description': f'Position top corners ({len(permute_corner_moves)} moves)'
-        })
+        steps.append(Step(
+            step='6. Permute Corners',
+            moves=tuple(permute_corner_moves),
+            description=f'Position top corners ({len(permute_corner_moves)} moves)'
+        ))
         
         # Step 7: Permute Top Edges (Final step)
         permute_edge_moves = self._permute_top_edges_bruteforce(cube)
         moves.extend(permute_edge_moves)
-        steps.append({
-            'step': '7. Permute Edges',
-            'moves': permute_edge_moves,
-            'description': f'Position top edges - complete! ({len(permute_edge_moves)} moves)'
-        })
+        steps.append(Step(
+            step='7. Permute Edges',
+            moves=tuple(permute_edge_moves),
+            description=f'Position top edges - complete! ({len(permute_edge_moves)} moves)'
+        ))
         
         # If not solved after all steps, use fallback
         if not cube.is_solved():
-            print("Beginner method incomplete, using fallback")
+            logger.debug("Beginner method incomplete, using fallback")
             fallback_moves = self._beginner_fallback(cube)
             moves.extend(fallback_moves)
-            steps.append({
-                'step': '8. Fallback',
-                'moves': fallback_moves,
-                'description': 'Final solving steps'
-            })
+            steps.append(Step(
+                step='8. Fallback',
+                moves=tuple(fallback_moves),
+                description='Final solving steps'
+            ))
         
         return {
             'success': True,
@@ -456,146 +725,54 @@ class CubeSolver:
             'algorithm': 'Layer-by-Layer Beginner Method'
         }
     
+    def _run_steps(self, cube: RubiksCube, steps: List[Tuple[Tuple[str, ...], bool]]) -> List[str]:
+        """
+        Apply (moves, check) steps with one compiled driver call, stopping
+        before the first checked step once the cube is solved
+        
+        The run is a pure function of the starting state, so results are
+        memoized on the packed stickers and repeat states skip the kernel.
+        """
+        state, moves = _run_steps_cached(cube.size, cube.state_bytes(), tuple(steps))
+        if moves:
+            cube.set_state(state)
+            cube.move_history.extend(moves)
+        return list(moves)
+    
     def _solve_bottom_cross_bruteforce(self, cube: RubiksCube) -> List[str]:
         """Bruteforce solve bottom cross using common patterns"""
-        moves = []
-        algorithms = [
-            ["F", "D", "R", "F'", "D'"],
-            ["R", "D'", "F", "D", "R'"],
-            ["D", "R", "U", "R'", "D'"],
-            ["F", "U", "F'", "D", "F", "D'"],
-        ]
-        
-        for attempt in range(8):  # Try different orientations
-            for alg in algorithms:
-                for move in alg:
-                    cube.apply_move(move)
-                    moves.append(move)
-            
-            # Rotate bottom to try different positions
-            cube.apply_move('D')
-            moves.append('D')
-            
-            if attempt % 2 == 0:
-                cube.apply_move('U')
-                moves.append('U')
-        
-        return moves
+        return self._run_steps(cube, _BOTTOM_CROSS_STEPS)
     
     def _solve_bottom_corners_bruteforce(self, cube: RubiksCube) -> List[str]:
         """Bruteforce solve bottom corners"""
-        moves = []
-        algorithms = [
-            ["R", "D", "R'", "D'"],
-            ["F", "D", "F'", "D'"],
-            ["R", "D2", "R'", "D'"],
-            ["L'", "D'", "L", "D"],
-        ]
-        
-        for attempt in range(12):
-            for alg in algorithms:
-                for move in alg:
-                    cube.apply_move(move)
-                    moves.append(move)
-            
-            if attempt % 3 == 0:
-                cube.apply_move('D')
-                moves.append('D')
-        
-        return moves
+        return self._run_steps(cube, _BOTTOM_CORNERS_STEPS)
     
     def _solve_middle_layer_bruteforce(self, cube: RubiksCube) -> List[str]:
         """Bruteforce solve middle layer"""
-        moves = []
-        right_hand = ["U", "R", "U'", "R'", "U'", "F'", "U", "F"]
-        left_hand = ["U'", "L'", "U", "L", "U", "F", "U'", "F'"]
-        
-        for attempt in range(8):
-            algorithm = right_hand if attempt % 2 == 0 else left_hand
-            for move in algorithm:
-                cube.apply_move(move)
-                moves.append(move)
-            
-            cube.apply_move('U')
-            moves.append('U')
-        
-        return moves
+        return self._run_steps(cube, _MIDDLE_LAYER_STEPS)
     
     def _solve_top_cross_bruteforce(self, cube: RubiksCube) -> List[str]:
         """Bruteforce solve top cross"""
-        moves = []
-        oll_alg = ["F", "R", "U", "R'", "U'", "F'"]
-        
-        for attempt in range(6):
-            for move in oll_alg:
-                cube.apply_move(move)
-                moves.append(move)
-            
-            cube.apply_move('U')
-            moves.append('U')
-        
-        return moves
+        return self._run_steps(cube, _TOP_CROSS_STEPS)
     
     def _orient_top_corners_bruteforce(self, cube: RubiksCube) -> List[str]:
         """Bruteforce orient top corners"""
-        moves = []
-        sune = ["R", "U", "R'", "U", "R", "U2", "R'"]
-        antisune = ["R", "U2", "R'", "U'", "R", "U'", "R'"]
-        
-        for attempt in range(8):
-            algorithm = sune if attempt % 2 == 0 else antisune
-            for move in algorithm:
-                cube.apply_move(move)
-                moves.append(move)
-            
-            cube.apply_move('U')
-            moves.append('U')
-        
-        return moves
+        return self._run_steps(cube, _ORIENT_TOP_CORNERS_STEPS)
     
     def _permute_top_corners_bruteforce(self, cube: RubiksCube) -> List[str]:
         """Bruteforce permute top corners"""
-        moves = []
-        t_perm = ["R", "U", "R'", "F'", "R", "U", "R'", "U'", "R'", "F", "R2", "U'", "R'"]
-        
-        for attempt in range(4):
-            for move in t_perm:
-                cube.apply_move(move)
-                moves.append(move)
-            
-            cube.apply_move('U')
-            moves.append('U')
-        
-        return moves
+        return self._run_steps(cube, _PERMUTE_TOP_CORNERS_STEPS)
     
     def _permute_top_edges_bruteforce(self, cube: RubiksCube) -> List[str]:
         """Bruteforce permute top edges"""
-        moves = []
-        u_perm = ["R", "U'", "R", "U", "R", "U", "R", "U'", "R'", "U'", "R2"]
-        h_perm = ["R2", "U2", "R", "U2", "R2", "U2", "R2", "U2", "R", "U2", "R2"]
-        
-        for attempt in range(6):
-            algorithm = u_perm if attempt % 2 == 0 else h_perm
-            for move in algorithm:
-                cube.apply_move(move)
-                moves.append(move)
-            
-            cube.apply_move('U')
-            moves.append('U')
-        
-        return moves
+        return self._run_steps(cube, _PERMUTE_TOP_EDGES_STEPS)
     
     def _beginner_fallback(self, cube: RubiksCube) -> List[str]:
         """Fallback for beginner method if layers don't complete"""
-        moves = []
-        
         # If beginner method fails, try move history reversal as backup
         if hasattr(cube, 'move_history') and cube.move_history:
-            print("Beginner fallback: using move history reversal")
-            for move in reversed(cube.move_history):
-                reverse_move = self._reverse_move(move)
-                cube.apply_move(reverse_move)
-                moves.append(reverse_move)
+            logger.debug("Beginner fallback: using move history reversal")
+            moves = self._undo_history(cube)
         else:
             # Final resort - reset
             cube.reset()
@@ -603,390 +780,150 @@ class CubeSolver:
         
         return moves
     
-    # Improved Kociemba Phase implementations
-    def _improved_phase1_solve(self, cube: RubiksCube) -> List[str]:
-        """Improved Phase 1: Reach G1 subgroup"""
-        moves = []
-        
-        # Better algorithms for phase 1
-        algorithms = [
-            # Edge orientation algorithms
-            ["F", "U", "R", "U'", "R'", "F'"],
-            ["R", "U", "R'", "F", "R", "F'"],
-            ["F", "R", "U", "R'", "U'", "F'"],
-            # Corner orientation algorithms  
-            ["R", "U", "R'", "U'", "R", "U", "R'"],
-            ["R", "U2", "R'", "U'", "R", "U'", "R'"],
-            ["L'", "U'", "L", "U", "L'", "U'", "L"]
-        ]
-        
-        # Apply algorithms strategically
-        for i in range(min(6, len(algorithms))):
-            algorithm = algorithms[i]
-            for move in algorithm:
-                cube.apply_move(move)
-                moves.append(move)
-            
-            # Rotate to try different positions
-            if i < 5:
-                cube.apply_move('U')
-                moves.append('U')
-        
-        return moves
-    
-    def _improved_phase2_solve(self, cube: RubiksCube) -> List[str]:
-        """Improved Phase 2: Solve within G1 subgroup"""
-        moves = []
-        
-        # G1 subgroup algorithms (only half-turns and U/D moves)
-        algorithms = [
-            ["R2", "U", "R2", "U'", "R2"],
-            ["F2", "U", "F2", "U'", "F2"],
-            ["R2", "D", "R2", "D'", "R2"],
-            ["U", "R2", "U'", "L2", "U", "R2", "U'", "L2"],
-            ["D", "R2", "D'", "L2", "D", "R2", "D'", "L2"]
-        ]
-        
-        # Apply G1 algorithms
-        for algorithm in algorithms:
-            for move in algorithm:
-                cube.apply_move(move)
-                moves.append(move)
-            
-            # Check if solved early
-            if cube.is_solved():
-                break
-            
-            # Try different U/D positions
-            cube.apply_move('U')
-            moves.append('U')
-        
-        return moves
-    
-    # Beginner method implementations (simplified)
-    def _solve_white_cross(self, cube: RubiksCube) -> List[str]:
-        """Solve white cross"""
-        moves = []
-        algorithm = ["F", "R", "U", "R'", "U'", "F'"]
-        
-        for i in range(8):  # Max attempts
-            for move in algorithm:
-                cube.apply_move(move)
-                moves.append(move)
-            
-            # Rotate top to try different positions
-            cube.apply_move('U')
-            moves.append('U')
-        
-        return moves
-    
-    def _solve_white_corners(self, cube: RubiksCube) -> List[str]:
-        """Solve white corners"""
-        moves = []
-        algorithm = ["R", "U", "R'", "U'"]
-        
-        for i in range(12):
-            for move in algorithm:
-                cube.apply_move(move)
-                moves.append(move)
-            
-            if i % 3 == 0:
-                cube.apply_move('U')
-                moves.append('U')
-        
-        return moves
-    
-    def _solve_second_layer(self, cube: RubiksCube) -> List[str]:
-        """Solve second layer"""
-        moves = []
-        right_algorithm = ["R", "U", "R'", "U'", "R'", "F", "R", "F'"]
-        left_algorithm = ["L'", "U'", "L", "U", "L", "F'", "L'", "F"]
-        
-        for i in range(6):
-            algorithm = right_algorithm if i % 2 == 0 else left_algorithm
-            for move in algorithm:
-                cube.apply_move(move)
-                moves.append(move)
-            
-            cube.apply_move('U')
-            moves.append('U')
-        
-        return moves
-    
-    def _solve_yellow_cross(self, cube: RubiksCube) -> List[str]:
-        """Solve yellow cross (OLL edges)"""
-        moves = []
-        algorithm = ["F", "R", "U", "R'", "U'", "F'"]
-        
-        for i in range(4):
-            for move in algorithm:
-                cube.apply_move(move)
-                moves.append(move)
-            
-            cube.apply_move('U')
-            moves.append('U')
-        
-        return moves
-    
-    def _solve_yellow_corners(self, cube: RubiksCube) -> List[str]:
-        """Orient yellow corners"""
-        moves = []
-        sune = ["R", "U", "R'", "U", "R", "U2", "R'"]
-        
-        for i in range(6):
-            for move in sune:
-                cube.apply_move(move)
-                moves.append(move)
-            
-            cube.apply_move('U')
-            moves.append('U')
-        
-        return moves
-    
-    def _permute_corners(self, cube: RubiksCube) -> List[str]:
-        """Permute last layer corners"""
-        moves = []
-        algorithm = ["R'", "F", "R'", "B2", "R", "F'", "R'", "B2", "R2"]
-        
-        for i in range(2):
-            for move in algorithm:
-                cube.apply_move(move)
-                moves.append(move)
-            
-            cube.apply_move('U')
-            moves.append('U')
-        
-        return moves
-    
-    def _permute_edges(self, cube: RubiksCube) -> List[str]:
-        """Permute last layer edges"""
-        moves = []
-        algorithm = ["R", "U'", "R", "U", "R", "U", "R", "U'", "R'", "U'", "R2"]
-        
-        for i in range(3):
-            for move in algorithm:
-                cube.apply_move(move)
-                moves.append(move)
-            
-            cube.apply_move('U')
-            moves.append('U')
-        
-        return moves
-    
     def _optimize_moves(self, moves: List[str]) -> List[str]:
-        """Optimize move sequence by removing redundant moves"""
-        if not moves:
-            return []
-        
-        optimized = []
-        i = 0
+        """
+        Optimize move sequence by removing redundant moves
         
-        while i < len(moves):
-            current = moves[i]
-            
-            # Look for consecutive moves on same face
-            if i + 1 < len(moves) and moves[i][0] == moves[i + 1][0]:
-                # Combine moves on same face
-                combined = self._combine_moves(current, moves[i + 1])
-                if combined:
-                    optimized.append(combined)
+        Single pass over a stack of move ids: same-face neighbours merge (or
+        cancel), and so do same-face moves separated by one turn of the
+        opposite face, which commutes with them. Cancellations cascade, so
+        R U U' R' -> []. Unknown tokens pass through as barriers.
+        """
+        unknown = []
+        stack = []
+        push, pop = stack.append, stack.pop
+        combine, face, opposite = _COMBINE_IDS, _MOVE_FACE, _OPPOSITE_FACE
+        for move in moves:
+            move_id = MOVE_IDX.get(move)
+            if move_id is None:
+                push(_N_MOVES + len(unknown))
+                unknown.append(move)
+                continue
+            push(move_id)
+            while len(stack) >= 2:
+                below = stack[-2]
+                if below < _N_MOVES and combine[below][move_id] != -2:
+                    pop()
+                    pop()
+                    combined = combine[below][move_id]
+                elif (len(stack) >= 3 and below < _N_MOVES and stack[-3] < _N_MOVES
+                      and face[below] == opposite[move_id] and combine[stack[-3]][move_id] != -2):
+                    pop()
+                    pop()
+                    combined = combine[pop()][move_id]
+                    if combined >= 0:
+                        push(combined)
+                    push(below)
+                    break
                 else:
-                    pass  # Moves cancel out
-                i += 2
-            else:
-                optimized.append(current)
-                i += 1
-        
-        return optimized
-    
-    def _combine_moves(self, move1: str, move2: str) -> Optional[str]:
-        """Combine two moves on the same face"""
-        if move1[0] != move2[0]:
-            return None
-        
-        face = move1[0]
-        
-        # Count total rotations
-        count1 = 3 if move1.endswith("'") else 1
-        count2 = 3 if move2.endswith("'") else 1
-        
-        total = (count1 + count2) % 4
-        
-        if total == 0:
-            return None  # Moves cancel out
-        elif total == 1:
-            return face
-        elif total == 2:
-            return face + "2"
-        else:  # total == 3
-            return face + "'"
+                    break
+                if combined < 0 or not stack:
+                    if combined >= 0:
+                        push(combined)
+                    break
+                push(combined)
+                move_id = combined
+        return [MOVE_NAMES[move_id] if move_id < _N_MOVES else unknown[move_id - _N_MOVES]
+                for move_id in stack]
+    
+    # Reduction stages check their goal first: outer-face turns never break
+    # up centers or edge groups, so they usually have nothing to do
+    def _centers_solved(self, cube: RubiksCube) -> bool:
+        """Every face's inner (N-2)x(N-2) center block is one color"""
+        inner = cube.stickers[:, 1:-1, 1:-1]
+        return bool((inner == inner[:, :1, :1]).all())
+    
+    def _edges_paired(self, cube: RubiksCube) -> bool:
+        """Every face's four edge strips (corners excluded) are one color each"""
+        stickers = cube.stickers
+        strips = (stickers[:, 0, 1:-1], stickers[:, -1, 1:-1], stickers[:, 1:-1, 0], stickers[:, 1:-1, -1])
+        return all(bool((strip == strip[:, :1]).all()) for strip in strips)
     
     def _solve_4x4_centers(self, cube: RubiksCube) -> List[str]:
         """Solve 4x4 cube centers"""
-        moves = []
-        algorithms = [
-            ["M", "U", "M'", "U2", "M", "U", "M'"],  # Center swapping
-            ["R", "U", "R'", "F", "R", "F'"],
-            ["L'", "U'", "L", "F'", "L'", "F"],
-        ]
-        
-        for attempt in range(10):
-            for alg in algorithms:
-                for move in alg:
-                    # Adapt moves for 4x4 (use wide turns when needed)
-                    adapted_move = self._adapt_move_for_4x4(move)
-                    if cube.apply_move(adapted_move):
-                        moves.append(adapted_move)
-            
-            if attempt % 3 == 0:
-                cube.apply_move('U')
-                moves.append('U')
-        
-        return moves
+        if self._centers_solved(cube):
+            return []
+        return self._run_steps(cube, _cycle_steps(_CENTER_ALGS_4X4, 10, 3))
     
     def _solve_4x4_edges(self, cube: RubiksCube) -> List[str]:
         """Solve 4x4 cube edge pairing"""
-        moves = []
-        pairing_algs = [
-            ["R", "U'", "R'", "F", "R", "F'"],
-            ["L'", "U", "L", "F'", "L'", "F"],
-            ["F", "R", "U'", "R'", "F'"],
-        ]
-        
-        for attempt in range(12):
-            for alg in pairing_algs:
-                for move in alg:
-                    adapted_move = self._adapt_move_for_4x4(move) 
-                    if cube.apply_move(adapted_move):
-                        moves.append(adapted_move)
-            
-            cube.apply_move('U')
-            moves.append('U')
-        
-        return moves
+        if self._edges_paired(cube):
+            return []
+        return self._run_steps(cube, _cycle_steps(_EDGE_ALGS_4X4, 12, 1))
     
     def _solve_5x5_centers(self, cube: RubiksCube) -> List[str]:
         """Solve 5x5 cube centers"""
-        moves = []
-        center_algs = [
-            ["R", "U", "R'", "U'", "R'", "F", "R", "F'"],
-            ["L'", "U'", "L", "U", "L", "F'", "L'", "F"],
-            ["F", "R", "U", "R'", "U'", "F'"],
-        ]
-        
-        for attempt in range(15):
-            for alg in center_algs:
-                for move in alg:
-                    if cube.apply_move(move):
-                        moves.append(move)
-            
-            if attempt % 4 == 0:
-                cube.apply_move('U')
-                moves.append('U')
-        
-        return moves
+        if self._centers_solved(cube):
+            return []
+        return self._run_steps(cube, _cycle_steps(_CENTER_ALGS_5X5, 15, 4))
     
     def _solve_5x5_edges(self, cube: RubiksCube) -> List[str]:
         """Solve 5x5 cube edge pairing"""
-        moves = []
-        edge_algs = [
-            ["R", "U", "R'", "F", "R", "F'", "U'", "R", "U", "R'"],
-            ["L'", "U'", "L", "F'", "L'", "F", "U", "L'", "U'", "L"],
-        ]
-        
-        for attempt in range(18):
-            for alg in edge_algs:
-                for move in alg:
-                    if cube.apply_move(move):
-                        moves.append(move)
-            
-            cube.apply_move('U')
-            moves.append('U')
-        
-        return moves
+        if self._edges_paired(cube):
+            return []
+        return self._run_steps(cube, _cycle_steps(_EDGE_ALGS_5X5, 18, 1))
     
     def _solve_nxn_centers(self, cube: RubiksCube) -> List[str]:
-        """Solve NxN cube centers (general)"""
-        moves = []
-        basic_algs = [
-            ["R", "U", "R'", "F", "R", "F'"],
-            ["L'", "U'", "L", "F'", "L'", "F"],
-            ["F", "U", "F'", "R", "U", "R'"],
-            ["U", "R", "U'", "R'"],
-        ]
+        """
+        Solve NxN cube centers (general)
         
+        Outer-layer turns never carry a center piece to another face, so
+        cluster commutators (column twists / row twists) would need inner
+        slice moves, which the cube model does not have yet.
+        """
+        if self._centers_solved(cube):
+            return []
         attempts = min(25, cube.size * 5)  # Scale with cube size
-        for attempt in range(attempts):
-            for alg in basic_algs:
-                for move in alg:
-                    if cube.apply_move(move):
-                        moves.append(move)
-            
-            if attempt % 5 == 0:
-                cube.apply_move('U')
-                moves.append('U')
-        
-        return moves
+        return self._run_steps(cube, _cycle_steps(_CENTER_ALGS_NXN, attempts, 5))
     
     def _solve_nxn_edges(self, cube: RubiksCube) -> List[str]:
         """Solve NxN cube edges (general)"""
-        moves = []
-        edge_algs = [
-            ["R", "U'", "R'", "F", "R", "F'", "R", "U", "R'"],
-            ["L'", "U", "L", "F'", "L'", "F", "L'", "U'", "L"],
-            ["F", "R", "U", "R'", "U'", "F'"],
-        ]
-        
+        if self._edges_paired(cube):
+            return []
         attempts = min(30, cube.size * 6)  # Scale with cube size
-        for attempt in range(attempts):
-            for alg in edge_algs:
-                for move in alg:
-                    if cube.apply_move(move):
-                        moves.append(move)
-            
-            cube.apply_move('U')
-            moves.append('U')
-        
-        return moves
+        return self._run_steps(cube, _cycle_steps(_EDGE_ALGS_NXN, attempts, 1))
     
     def _solve_as_3x3(self, cube: RubiksCube) -> List[str]:
-        """Solve reduced cube as if it were 3x3"""
-        moves = []
+        """
+        Solve reduced cube as if it were 3x3
         
-        # Use basic 3x3 algorithms
-        basic_3x3_algs = [
-            ["R", "U", "R'", "U'"],
-            ["F", "R", "U", "R'", "U'", "F'"],
-            ["R", "U", "R'", "F'", "R", "U", "R'", "U'", "R'", "F", "R2", "U'", "R'"],
-        ]
-        
-        for attempt in range(20):
-            for alg in basic_3x3_algs:
-                for move in alg:
-                    if cube.apply_move(move):
-                        moves.append(move)
-            
-            cube.apply_move('U')
-            moves.append('U')
+        Once centers and edge groups are formed, the outer rows/columns and
+        the middle of each face behave exactly like a 3x3, so that 3x3 is
+        handed to the two-phase solver (kociemba library, or the table-driven
+        fallback) and its outer-face solution is applied to the big cube.
+        Cubes that are not really reduced keep the old fixed algorithm run.
+        """
+        try:
+            moves = self._two_phase_3x3(self._reduced_3x3(cube))
+        except ValueError as e:
+            logger.debug("Reduced cube is not a valid 3x3: %s", e)
+            moves = None
+        if moves is not None:
+            cube.apply_move_sequence(moves)
+            return moves
         
-        return moves
+        # Use basic 3x3 algorithms
+        return self._run_steps(cube, _cycle_steps(_BASIC_3X3_ALGS, 20, 1))
     
-    def _adapt_move_for_4x4(self, move: str) -> str:
-        """Adapt move notation for 4x4 cubes (add wide turns when beneficial)"""
-        # For now, keep moves the same - can be enhanced later
-        return move
+    def _reduced_3x3(self, cube: RubiksCube) -> RubiksCube:
+        """3x3 view of an NxN cube: first, middle and last row/column of every face"""
+        rows = [0, cube.size // 2, cube.size - 1]
+        reduced = RubiksCube(3)
+        reduced.stickers[...] = cube.stickers[:, rows][:, :, rows]
+        return reduced
+    
+    def _two_phase_3x3(self, cube: RubiksCube) -> Optional[List[str]]:
+        """Two-phase solution of a 3x3 (None if the search gives up); ValueError for invalid states"""
+        if KOCIEMBA_AVAILABLE:
+            return _kociemba_solve(self._cube_to_kociemba_string(cube)).split()
+        return ida_star.solve_two_phase(cube)
     
     def _reduction_fallback(self, cube: RubiksCube) -> List[str]:
         """Fallback for reduction method"""
-        moves = []
-        
         # Try move history reversal
         if hasattr(cube, 'move_history') and cube.move_history:
-            print("Reduction fallback: using move history reversal")
-            for move in reversed(cube.move_history):
-                reverse_move = self._reverse_move(move)
-                cube.apply_move(reverse_move)
-                moves.append(reverse_move)
+            logger.debug("Reduction fallback: using move history reversal")
+            moves = self._undo_history(cube)
         else:
             # Final resort - reset
             cube.reset()
@@ -0,0 +1,279 @@
+"""
+Cubie-Level 3x3 Model
+Corner/edge permutation and orientation, coordinates, move tables and
+pattern databases used by the table-driven solvers
+"""
+from functools import lru_cache
+from itertools import combinations, permutations
+from math import factorial
+from typing import Dict, Tuple
+
+import numpy as np
+
+from models import RubiksCube
+
+# Quarter-turn moves the tables are built for, in kernel move-id order
+MOVES = ('U', "U'", 'R', "R'", 'F', "F'", 'D', "D'", 'L', "L'", 'B', "B'")
+MOVE_FACE = np.array([index // 2 for index in range(len(MOVES))], dtype=np.int8)
+N_MOVES = len(MOVES)
+
+# Moves that keep a cube in the phase-2 subgroup <U, D, R2, L2, F2, B2>
+PHASE2_MOVES = ('U', "U'", 'U2', 'D', "D'", 'D2', 'R2', 'L2', 'F2', 'B2')
+PHASE2_FACE = np.array(['URFDLB'.index(move[0]) for move in PHASE2_MOVES], dtype=np.int8)
+
+# Facelet indices (U, R, F, D, L, B faces, row-major) of each corner and edge
+# position, first facelet on the U/D face (or F/B for the E-slice edges):
+# corners URF UFL ULB UBR DFR DLF DBL DRB, edges UR UF UL UB DR DF DL DB FR FL BL BR
+CORNER_FACELETS = (
+    (8, 9, 20), (6, 18, 38), (0, 36, 47), (2, 45, 11),
+    (29, 26, 15), (27, 44, 24), (33, 53, 42), (35, 17, 51)
+)
+EDGE_FACELETS = (
+    (5, 10), (7, 19), (3, 37), (1, 46), (32, 16), (28, 25),
+    (30, 43), (34, 52), (23, 12), (21, 41), (50, 39), (48, 14)
+)
+# Home faces of each corner and edge cubie (same order)
+CORNER_FACES = tuple(tuple(index // 9 for index in facelets) for facelets in CORNER_FACELETS)
+EDGE_FACES = tuple(tuple(index // 9 for index in facelets) for facelets in EDGE_FACELETS)
+SLICE_EDGES = (8, 9, 10, 11)  # FR FL BL BR
+
+N_TWIST = 3 ** 7
+N_FLIP = 2 ** 11
+N_SLICE = 495  # C(12, 4) placements of the E-slice edges
+N_CORNERS = factorial(8)
+N_UD_EDGES = factorial(8)  # Permutation of the 8 U/D-layer edges in phase 2
+N_SLICE_PERM = factorial(4)  # Permutation of the 4 E-slice edges in phase 2
+
+
+def facelets_to_cubies(facelets) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Convert 54 facelet codes to (cp, co, ep, eo) arrays
+
+    Stickers are mapped to faces through the centers, so any color scheme
+    works. Raises ValueError if a piece is not a real cubie.
+    """
+    facelets = [int(code) for code in facelets]
+    face_of = {facelets[9 * face + 4]: face for face in range(6)}
+    if len(face_of) != 6:
+        raise ValueError('Centers must all be different colors')
+    faces = [face_of.get(code, -1) for code in facelets]
+
+    cp = np.zeros(8, dtype=np.int8)
+    co = np.zeros(8, dtype=np.int8)
+    for position, corner in enumerate(CORNER_FACELETS):
+        colors = [faces[index] for index in corner]
+        for ori in range(3):
+            if colors[ori] in (0, 3):  # U or D sticker marks the orientation
+                break
+        else:
+            raise ValueError(f'Corner {position} has no U/D sticker')
+        key = (colors[ori], colors[(ori + 1) % 3], colors[(ori + 2) % 3])
+        if key not in CORNER_FACES:
+            raise ValueError(f'Corner {position} is not a valid cubie')
+        cp[position] = CORNER_FACES.index(key)
+        co[position] = ori
+
+    ep = np.zeros(12, dtype=np.int8)
+    eo = np.zeros(12, dtype=np.int8)
+    for position, edge in enumerate(EDGE_FACELETS):
+        colors = (faces[edge[0]], faces[edge[1]])
+        if colors in EDGE_FACES:
+            ep[position], eo[position] = EDGE_FACES.index(colors), 0
+        elif colors[::-1] in EDGE_FACES:
+            ep[position], eo[position] = EDGE_FACES.index(colors[::-1]), 1
+        else:
+            raise ValueError(f'Edge {position} is not a valid cubie')
+
+    # Every cubie exactly once, and only states reachable by turning faces
+    if len(set(cp.tolist())) != 8 or len(set(ep.tolist())) != 12:
+        raise ValueError('Some cubies appear twice')
+    if co.sum() % 3 or eo.sum() % 2:
+        raise ValueError('Twisted corner or flipped edge, cube is unsolvable')
+    if _parity(cp) != _parity(ep):
+        raise ValueError('Swapped pieces, cube is unsolvable')
+    return cp, co, ep, eo
+
+
+def _parity(perm: np.ndarray) -> int:
+    """0 for an even permutation, 1 for odd"""
+    n = len(perm)
+    return int((perm[:, None] > perm[None, :])[np.triu_indices(n, 1)].sum() % 2)
+
+
+def cube_to_cubies(cube: RubiksCube):
+    """Cubie arrays of a 3x3 RubiksCube"""
+    if cube.size != 3:
+        raise ValueError('Cubie model only covers 3x3 cubes')
+    return facelets_to_cubies(cube.stickers.ravel())
+
+
+@lru_cache(maxsize=None)
+def move_cubies(moves: Tuple[str, ...] = MOVES) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Cubie form of every move, read off the sticker model
+
+    Returns (cp, co, ep, eo) stacked as (len(moves), 8/12) arrays. Applying
+    move m to state s: cp' = cp[M.cp], co' = (co[M.cp] + M.co) % 3, same for edges.
+    """
+    rows = []
+    for move in moves:
+        cube = RubiksCube(3)
+        cube.apply_move(move)
+        rows.append(cube_to_cubies(cube))
+    return tuple(np.stack(parts) for parts in zip(*rows))
+
+
+# Coordinate encoders over rows of cubie arrays (vectorized)
+def encode_twist(co: np.ndarray) -> np.ndarray:
+    """Corner orientation coordinate, 0..2186 (last corner is implied)"""
+    weights = 3 ** np.arange(6, -1, -1)
+    return (co[..., :7].astype(np.int64) * weights).sum(axis=-1)
+
+
+def encode_flip(eo: np.ndarray) -> np.ndarray:
+    """Edge orientation coordinate, 0..2047 (last edge is implied)"""
+    weights = 2 ** np.arange(10, -1, -1)
+    return (eo[..., :11].astype(np.int64) * weights).sum(axis=-1)
+
+
+def encode_perm(perm: np.ndarray) -> np.ndarray:
+    """Lexicographic rank of each permutation row"""
+    n = perm.shape[-1]
+    rank = np.zeros(perm.shape[:-1], dtype=np.int64)
+    for i in range(n):
+        smaller_after = (perm[..., i + 1:] < perm[..., i:i + 1]).sum(axis=-1)
+        rank += smaller_after * factorial(n - 1 - i)
+    return rank
+
+
+@lru_cache(maxsize=None)
+def _slice_lut() -> Tuple[np.ndarray, np.ndarray]:
+    """Bitmask of slice-edge positions <-> slice coordinate"""
+    masks = np.array([sum(1 << p for p in combo) for combo in combinations(range(12), 4)])
+    lut = np.full(1 << 12, -1, dtype=np.int64)
+    lut[masks] = np.arange(len(masks))
+    return masks, lut
+
+
+def encode_slice(ep: np.ndarray) -> np.ndarray:
+    """Placement of the four E-slice edges, 0..494 (order ignored)"""
+    in_slice = ep >= SLICE_EDGES[0]
+    mask = (in_slice.astype(np.int64) << np.arange(12)).sum(axis=-1)
+    return _slice_lut()[1][mask]
+
+
+def coordinates(cp, co, ep, eo) -> Tuple[int, int, int, int]:
+    """(twist, flip, slice, corners) coordinates of one cubie state"""
+    return (int(encode_twist(co)), int(encode_flip(eo)),
+            int(encode_slice(ep)), int(encode_perm(cp)))
+
+
+SOLVED_SLICE = int(encode_slice(np.arange(12)))
+
+
+@lru_cache(maxsize=None)
+def move_tables() -> Dict[str, np.ndarray]:
+    """
+    Coordinate move tables, each (coordinate_count, N_MOVES) int32
+
+    Built by decoding every coordinate value to a representative cubie row,
+    applying all moves at once with fancy indexing and re-encoding.
+    """
+    m_cp, m_co, m_ep, m_eo = move_cubies()
+
+    # Every twist/flip value as orientation rows
+    twist_digits = np.array(np.unravel_index(np.arange(N_TWIST), (3,) * 7)).T
+    all_co = np.hstack([twist_digits, (-twist_digits.sum(axis=1) % 3)[:, None]])
+    flip_digits = np.array(np.unravel_index(np.arange(N_FLIP), (2,) * 11)).T
+    all_eo = np.hstack([flip_digits, (flip_digits.sum(axis=1) % 2)[:, None]])
+    masks = _slice_lut()[0]
+    all_slice = ((masks[:, None] >> np.arange(12)) & 1).astype(bool)
+    all_cp = np.array(list(permutations(range(8))), dtype=np.int8)
+
+    tables = {
+        'twist': np.empty((N_TWIST, N_MOVES), dtype=np.int32),
+        'flip': np.empty((N_FLIP, N_MOVES), dtype=np.int32),
+        'slice': np.empty((N_SLICE, N_MOVES), dtype=np.int32),
+        'corners': np.empty((N_CORNERS, N_MOVES), dtype=np.int32),
+    }
+    lut = _slice_lut()[1]
+    for m in range(N_MOVES):
+        tables['twist'][:, m] = encode_twist((all_co[:, m_cp[m]] + m_co[m]) % 3)
+        tables['flip'][:, m] = encode_flip((all_eo[:, m_ep[m]] + m_eo[m]) % 2)
+        moved = all_slice[:, m_ep[m]]
+        tables['slice'][:, m] = lut[(moved.astype(np.int64) << np.arange(12)).sum(axis=1)]
+        tables['corners'][:, m] = encode_perm(all_cp[:, m_cp[m]])
+    return tables
+
+
+def build_pruning_table(table_a: np.ndarray, table_b: np.ndarray, start: int) -> np.ndarray:
+    """
+    Breadth-first distances over the product of two coordinates
+
+    Entry a * len(table_b) + b is the move count from start to (a, b).
+    Pass table_b=None for a single-coordinate table.
+    """
+    size_b = 1 if table_b is None else len(table_b)
+    dist = np.full(len(table_a) * size_b, 255, dtype=np.uint8)
+    dist[start] = 0
+    frontier = np.array([start], dtype=np.int64)
+    depth = 0
+    while len(frontier):
+        a, b = np.divmod(frontier, size_b)
+        reached = []
+        for m in range(table_a.shape[1]):
+            nxt = table_a[a, m].astype(np.int64) * size_b
+            if table_b is not None:
+                nxt += table_b[b, m]
+            reached.append(nxt[dist[nxt] == 255])
+        frontier = np.unique(np.concatenate(reached))
+        depth += 1
+        dist[frontier] = depth
+    return dist
+
+
+@lru_cache(maxsize=None)
+def pruning_tables() -> Dict[str, np.ndarray]:
+    """Pattern databases for twist x slice, flip x slice and corner permutation"""
+    tables = move_tables()
+    return {
+        'twist_slice': build_pruning_table(tables['twist'], tables['slice'], SOLVED_SLICE),
+        'flip_slice': build_pruning_table(tables['flip'], tables['slice'], SOLVED_SLICE),
+        'corners': build_pruning_table(tables['corners'], None, 0),
+    }
+
+
+@lru_cache(maxsize=None)
+def phase2_move_tables() -> Dict[str, np.ndarray]:
+    """
+    Phase-2 coordinate move tables over PHASE2_MOVES, each (count, 10) int32
+
+    'corners' is the corner permutation, 'ud_edges' the permutation of the
+    U/D-layer edges and 'slice_perm' that of the E-slice edges. Phase-2
+    moves never mix the two edge groups, so each is ranked on its own.
+    """
+    m_cp, _, m_ep, _ = move_cubies(PHASE2_MOVES)
+    all_8 = np.array(list(permutations(range(8))), dtype=np.int8)
+    all_4 = np.array(list(permutations(range(4))), dtype=np.int8)
+    n_moves = len(PHASE2_MOVES)
+
+    tables = {
+        'corners': np.empty((N_CORNERS, n_moves), dtype=np.int32),
+        'ud_edges': np.empty((N_UD_EDGES, n_moves), dtype=np.int32),
+        'slice_perm': np.empty((N_SLICE_PERM, n_moves), dtype=np.int32),
+    }
+    for m in range(n_moves):
+        tables['corners'][:, m] = encode_perm(all_8[:, m_cp[m]])
+        tables['ud_edges'][:, m] = encode_perm(all_8[:, m_ep[m, :8]])
+        tables['slice_perm'][:, m] = encode_perm(all_4[:, m_ep[m, 8:] - 8])
+    return tables
+
+
+@lru_cache(maxsize=None)
+def phase2_pruning_tables() -> Dict[str, np.ndarray]:
+    """Phase-2 pattern databases for corners x slice and U/D edges x slice permutations"""
+    tables = phase2_move_tables()
+    return {
+        'corners_slice': build_pruning_table(tables['corners'], tables['slice_perm'], 0),
+        'edges_slice': build_pruning_table(tables['ud_edges'], tables['slice_perm'], 0),
+    }
@@ -5,7 +5,7 @@ Demonstrates complete user workflow with 4x4 cube solving
 
 import time
 from models import RubiksCube
-from cube_solver import CubeSolver
+from cube_solver import CubeSolver, Step
 
 def run_example_trace():
     """
@@ -20,7 +20,9 @@ def run_example_trace():
     print("-" * 30)
     solver = CubeSolver()
     cube = RubiksCube(size=4)  # Create 4x4 cube
-    print(f"✅ Created {cube.size}x{cube.size} cube ({cube.size**3} cubies)")
+    n = cube.size
+    pieces = n ** 3
+    print(f"✅ Created {n}x{n} cube ({pieces} cubies)")
     print(f"✅ Algorithm options: {list(solver.algorithms.keys())}")
     print(f"✅ Initial state: {'SOLVED' if cube.is_solved() else 'UNSOLVED'}")
     
@@ -33,19 +35,19 @@ def run_example_trace():
     
     # Apply scramble moves
     print("\nApplying scramble moves...")
-    for i, move in enumerate(scramble_moves, 1):
-        cube.apply_move(move)
-        print(f"  {i:2d}/25: {move} applied")
+    cube.apply_algorithm(scramble_moves)
+    print("\n".join(f"  {i:2d}/{len(scramble_moves)}: {move} applied"
+                    for i, move in enumerate(scramble_moves, 1)))
     
     print(f"✅ Scramble complete - State: {'SOLVED' if cube.is_solved() else 'SCRAMBLED'}")
     
     # Step 3: Algorithm Selection
     print("\n🧠 STEP 3: Algorithm Selection")
     print("-" * 30)
-    selected_algorithm = 'reduction' if cube.size > 3 else 'kociemba'
-    print(f"Cube size: {cube.size}x{cube.size}")
+    selected_algorithm = 'reduction' if n > 3 else 'kociemba'
+    print(f"Cube size: {n}x{n}")
     print(f"Auto-selected algorithm: {selected_algorithm.upper()}")
-    print(f"Reason: {'Reduction method for NxN cubes' if cube.size > 3 else 'Kociemba optimal for 3x3'}")
+    print(f"Reason: {'Reduction method for NxN cubes' if n > 3 else 'Kociemba optimal for 3x3'}")
     
     # Step 4: Solving Process
     print("\n⚡ STEP 4: Solving Process")
@@ -71,7 +73,7 @@ def run_example_trace():
         print("\n🔍 STEP 6: Solution Breakdown")
         print("-" * 30)
         for i, step in enumerate(solution['steps'], 1):
-            step_info = step if isinstance(step, dict) else {'step': f'Step {i}', 'moves': [], 'description': 'Processing'}
+            step_info = step if isinstance(step, (dict, Step)) else {'step': f'Step {i}', 'moves': [], 'description': 'Processing'}
             print(f"Step {i}: {step_info.get('step', 'Unknown')}")
             print(f"  Description: {step_info.get('description', 'N/A')}")
             print(f"  Moves: {len(step_info.get('moves', []))}")
@@ -84,11 +86,11 @@ def run_example_trace():
     # Step 7: Performance Metrics
     print("\n📈 STEP 7: Performance Metrics")
     print("-" * 30)
-    print(f"Cube complexity: {cube.size}x{cube.size} = {cube.size**3} pieces")
+    print(f"Cube complexity: {n}x{n} = {pieces} pieces")
     print(f"Algorithm efficiency: {len(solution.get('moves', []))} moves")
     print(f"Processing speed: {solve_time*1000:.2f}ms")
     print(f"Success rate: 100% (guaranteed solve)")
-    print(f"Memory usage: ~{estimate_memory_usage(cube.size)}MB")
+    print(f"Memory usage: ~{estimate_memory_usage(n)}MB")
     
     # Step 8: Verification
     print("\n✅ STEP 8: Solution Verification")
@@ -109,7 +111,7 @@ def run_example_trace():
     print("✅ Complete verification passed")
     
     return {
-        'cube_size': cube.size,
+        'cube_size': n,
         'scramble_moves': len(scramble_moves),
         'algorithm': selected_algorithm,
         'solution_moves': len(solution.get('moves', [])),
@@ -117,19 +119,27 @@ def run_example_trace():
         'success': verification_result
     }
 
+# Standard demonstration scramble (immutable; copy with list() to modify)
+_TEST_SCRAMBLE = (
+    'R', 'U', 'F2', 'D', "U'", "R'", 'B', "F'", 'L', 'D2',
+    'U', 'B2', "L'", 'F', 'R2', "D'", 'U2', "B'", 'L2', 'F',
+    "U'", 'R', "D'", 'B', "L'"
+)
+
 def generate_test_scramble():
     """Generate a standard test scramble for demonstration"""
-    return [
-        'R', 'U', 'F2', 'D', "U'", "R'", 'B', "F'", 'L', 'D2',
-        'U', 'B2', "L'", 'F', 'R2', "D'", 'U2', "B'", 'L2', 'F',
-        "U'", 'R', "D'", 'B', "L'"
-    ]
+    return _TEST_SCRAMBLE
+
+def _memory_estimate(cube_size):
+    """Base cube model (1 MB) plus approximate 3D rendering, in MB"""
+    return round(1 + (cube_size ** 3) * 0.1, 1)
+
+# Estimates for the supported sizes, computed once
+_MEMORY_ESTIMATES = {size: _memory_estimate(size) for size in range(2, 8)}
 
 def estimate_memory_usage(cube_size):
     """Estimate memory usage for different cube sizes"""
-    base_memory = 1  # Base cube model in MB
-    visual_memory = (cube_size ** 3) * 0.1  # Approximate 3D rendering
-    return round(base_memory + visual_memory, 1)
+    return _MEMORY_ESTIMATES.get(cube_size) or _memory_estimate(cube_size)
 
 def show_algorithm_comparison():
     """Compare different algorithms for presentation"""
@@ -0,0 +1,15 @@
+"""
+Gunicorn configuration for deployment
+Usage: gunicorn -c gunicorn.conf.py wsgi:app
+"""
+import multiprocessing
+
+bind = '0.0.0.0:5000'
+# Cubes live in each worker's memory (see CUBES in app.py), so a client
+# must keep hitting the same worker: scale with threads, not processes
+workers = 1
+worker_class = 'gthread'
+threads = multiprocessing.cpu_count() * 2 + 1
+timeout = 120  # Large-cube solves need headroom
+# Import the app (and warm solver tables) once in the master process
+preload_app = True
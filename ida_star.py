@@ -0,0 +1,353 @@
+"""
+IDA* Solvers
+Iterative-deepening A* over cubie coordinates with pattern-database
+heuristics: an optimal solver and a Kociemba-style two-phase solver.
+The search kernels are compiled with numba when available
+"""
+import time
+from typing import List, Optional
+
+import numpy as np
+
+import cubie
+from cube_kernels import NUMBA_AVAILABLE, njit
+from models import RubiksCube
+
+# Optimal quarter-turn solutions run up to 26 moves; deep random positions
+# blow the node budget long before that, so the search gives up instead.
+# MAX_SECONDS is a wall-clock backstop, checked between deepening passes
+MAX_DEPTH = 26
+MAX_NODES = 50_000_000 if NUMBA_AVAILABLE else 200_000
+MAX_SECONDS = 10.0
+
+# Two-phase search: phase 1 (quarter turns) into <U, D, R2, L2, F2, B2>,
+# then phase 2 inside it. The first solution found is then shortened by
+# searching again below its length, each retry with IMPROVE_NODES
+MAX_PHASE1_DEPTH = 14
+MAX_TWO_PHASE_LENGTH = 32
+IMPROVE_NODES = 1_000_000 if NUMBA_AVAILABLE else 20_000
+
+
+@njit(cache=True)
+def _heuristic(tw, fl, sl, cp, p_ts, p_fs, p_cp):
+    """Admissible lower bound: the largest of the three pattern databases"""
+    h = p_ts[tw * 495 + sl]
+    h2 = p_fs[fl * 495 + sl]
+    if h2 > h:
+        h = h2
+    h3 = p_cp[cp]
+    if h3 > h:
+        h = h3
+    return h
+
+
+@njit(cache=True)
+def _search(tw0, fl0, sl0, cp0, ep0, bound, solved_slice,
+            t_tw, t_fl, t_sl, t_cp, m_ep, move_face,
+            p_ts, p_fs, p_cp, path, max_nodes):
+    """
+    One depth-bounded DFS pass, iterative to keep it numba-friendly
+
+    Returns (solution length or -1, nodes visited); path holds the moves.
+    """
+    n_moves = t_tw.shape[1]
+    tw = np.empty(bound + 1, np.int64)
+    fl = np.empty(bound + 1, np.int64)
+    sl = np.empty(bound + 1, np.int64)
+    cp = np.empty(bound + 1, np.int64)
+    ep = np.empty((bound + 1, 12), np.int8)
+    next_move = np.zeros(bound + 1, np.int64)
+    tw[0], fl[0], sl[0], cp[0] = tw0, fl0, sl0, cp0
+    ep[0, :] = ep0
+    nodes = 0
+    d = 0
+    while d >= 0:
+        m = next_move[d]
+        if m == n_moves or d == bound:
+            d -= 1
+            continue
+        next_move[d] = m + 1
+
+        # Skip redundant successors: only X X (never X' X' or X X X) on one
+        # face, and commuting opposite faces only in ascending face order
+        if d > 0:
+            prev = path[d - 1]
+            face, prev_face = move_face[m], move_face[prev]
+            if face == prev_face:
+                if m != prev or m % 2 == 1 or (d > 1 and path[d - 2] == m):
+                    continue
+            elif face == (prev_face + 3) % 6 and face < prev_face:
+                continue
+
+        c = d + 1
+        tw[c] = t_tw[tw[d], m]
+        fl[c] = t_fl[fl[d], m]
+        sl[c] = t_sl[sl[d], m]
+        cp[c] = t_cp[cp[d], m]
+        nodes += 1
+        if nodes > max_nodes:
+            return -1, nodes
+        h = _heuristic(tw[c], fl[c], sl[c], cp[c], p_ts, p_fs, p_cp)
+        if c + h > bound:
+            continue
+        for i in range(12):
+            ep[c, i] = ep[d, m_ep[m, i]]
+        path[d] = m
+        if h == 0 and tw[c] == 0 and fl[c] == 0 and sl[c] == solved_slice and cp[c] == 0:
+            solved = True
+            for i in range(12):
+                if ep[c, i] != i:
+                    solved = False
+                    break
+            if solved:
+                return c, nodes
+        d = c
+        next_move[d] = 0
+    return -1, nodes
+
+
+def solve_optimal(cube: RubiksCube, max_depth: int = MAX_DEPTH,
+                  max_nodes: int = MAX_NODES,
+                  time_limit: float = MAX_SECONDS) -> Optional[List[str]]:
+    """
+    Shortest quarter-turn solution of a 3x3 cube, or None if the search
+    exceeds max_depth, max_nodes or time_limit seconds
+    """
+    deadline = time.monotonic() + time_limit
+    cp, co, ep, eo = cubie.cube_to_cubies(cube)
+    tw, fl, sl, corners = cubie.coordinates(cp, co, ep, eo)
+    tables = cubie.move_tables()
+    pruning = cubie.pruning_tables()
+    m_ep = cubie.move_cubies()[2]
+    args = (tables['twist'], tables['flip'], tables['slice'], tables['corners'],
+            m_ep, cubie.MOVE_FACE,
+            pruning['twist_slice'], pruning['flip_slice'], pruning['corners'])
+
+    path = np.zeros(max_depth + 1, dtype=np.int64)
+    nodes_left = max_nodes
+    bound = int(_heuristic(tw, fl, sl, corners, *args[-3:]))
+    while bound <= max_depth and nodes_left > 0 and time.monotonic() < deadline:
+        if bound == 0 and (ep == np.arange(12)).all():
+            return []
+        length, nodes = _search(tw, fl, sl, corners, ep, bound, cubie.SOLVED_SLICE,
+                                *args[:6], *args[6:], path, nodes_left)
+        if length >= 0:
+            return [cubie.MOVES[m] for m in path[:length]]
+        nodes_left -= nodes
+        bound += 1
+    return None
+
+
+@njit(cache=True)
+def _perm_rank(values, offset):
+    """Lexicographic rank of values - offset (same order as cubie.encode_perm)"""
+    n = values.shape[0]
+    rank = 0
+    for i in range(n):
+        smaller_after = 0
+        for j in range(i + 1, n):
+            if values[j] < values[i]:
+                smaller_after += 1
+        rank = rank * (n - i) + smaller_after
+    return rank
+
+
+@njit(cache=True)
+def _phase2_search(cp0, ud0, sp0, bound, prev_face, t_cp, t_ud, t_sp, move_face,
+                   p_cs, p_es, path, max_nodes):
+    """
+    One depth-bounded phase-2 DFS pass (same shape as _search)
+
+    Returns (solution length or -1, nodes visited); path holds the moves.
+    """
+    n_moves = t_cp.shape[1]
+    cp = np.empty(bound + 1, np.int64)
+    ud = np.empty(bound + 1, np.int64)
+    sp = np.empty(bound + 1, np.int64)
+    next_move = np.zeros(bound + 1, np.int64)
+    cp[0], ud[0], sp[0] = cp0, ud0, sp0
+    if cp0 == 0 and ud0 == 0 and sp0 == 0:
+        return 0, 0
+    nodes = 0
+    d = 0
+    while d >= 0:
+        m = next_move[d]
+        if m == n_moves or d == bound:
+            d -= 1
+            continue
+        next_move[d] = m + 1
+
+        # One move per face in a row, commuting opposite faces ascending only
+        last = path[d - 1] if d > 0 else -1
+        last_face = move_face[last] if d > 0 else prev_face
+        if last_face >= 0:
+            face = move_face[m]
+            if face == last_face or (face == (last_face + 3) % 6 and face < last_face):
+                continue
+
+        c = d + 1
+        cp[c] = t_cp[cp[d], m]
+        ud[c] = t_ud[ud[d], m]
+        sp[c] = t_sp[sp[d], m]
+        nodes += 1
+        if nodes > max_nodes:
+            return -1, nodes
+        h = p_cs[cp[c] * 24 + sp[c]]
+        h2 = p_es[ud[c] * 24 + sp[c]]
+        if h2 > h:
+            h = h2
+        if c + h > bound:
+            continue
+        path[d] = m
+        if h == 0 and cp[c] == 0 and ud[c] == 0 and sp[c] == 0:
+            return c, nodes
+        d = c
+        next_move[d] = 0
+    return -1, nodes
+
+
+@njit(cache=True)
+def _phase2_solve(cp, ep, prev_face, limit, t_cp, t_ud, t_sp, move_face,
+                  p_cs, p_es, path, max_nodes):
+    """Iterative deepening of phase 2 up to limit moves; returns (length or -1, nodes)"""
+    ud = _perm_rank(ep[:8], 0)
+    sp = _perm_rank(ep[8:], 8)
+    bound = p_cs[cp * 24 + sp]
+    h2 = p_es[ud * 24 + sp]
+    if h2 > bound:
+        bound = h2
+    nodes = 0
+    while bound <= limit:
+        length, visited = _phase2_search(cp, ud, sp, bound, prev_face, t_cp, t_ud, t_sp,
+                                         move_face, p_cs, p_es, path, max_nodes - nodes)
+        nodes += visited
+        if length >= 0 or nodes > max_nodes:
+            return length, nodes
+        bound += 1
+    return -1, nodes
+
+
+@njit(cache=True)
+def _two_phase_search(tw0, fl0, sl0, cp0, ep0, bound, max_length,
+                      t_tw, t_fl, t_sl, t_cp, m_ep, move_face, p_ts, p_fs,
+                      t2_cp, t2_ud, t2_sp, face2, p2_cs, p2_es,
+                      path1, path2, max_nodes):
+    """
+    Phase-1 DFS over quarter turns to depth exactly bound; every phase-1
+    solution found is handed to phase 2 with the remaining move budget
+
+    Returns (phase-1 length or -1, phase-2 length, nodes visited).
+    """
+    n_moves = t_tw.shape[1]
+    tw = np.empty(bound + 1, np.int64)
+    fl = np.empty(bound + 1, np.int64)
+    sl = np.empty(bound + 1, np.int64)
+    cp = np.empty(bound + 1, np.int64)
+    ep = np.empty((bound + 1, 12), np.int8)
+    next_move = np.zeros(bound + 1, np.int64)
+    tw[0], fl[0], sl[0], cp[0] = tw0, fl0, sl0, cp0
+    ep[0, :] = ep0
+    nodes = 0
+    d = 0
+    while d >= 0:
+        m = next_move[d]
+        if m == n_moves or d == bound:
+            d -= 1
+            continue
+        next_move[d] = m + 1
+
+        if d > 0:
+            prev = path1[d - 1]
+            face, prev_face = move_face[m], move_face[prev]
+            if face == prev_face:
+                if m != prev or m % 2 == 1 or (d > 1 and path1[d - 2] == m):
+                    continue
+            elif face == (prev_face + 3) % 6 and face < prev_face:
+                continue
+
+        c = d + 1
+        tw[c] = t_tw[tw[d], m]
+        fl[c] = t_fl[fl[d], m]
+        sl[c] = t_sl[sl[d], m]
+        nodes += 1
+        if nodes > max_nodes:
+            return -1, 0, nodes
+        h = p_ts[tw[c] * 495 + sl[c]]
+        h2 = p_fs[fl[c] * 495 + sl[c]]
+        if h2 > h:
+            h = h2
+        if c + h > bound:
+            continue
+        cp[c] = t_cp[cp[d], m]
+        for i in range(12):
+            ep[c, i] = ep[d, m_ep[m, i]]
+        path1[d] = m
+
+        if c == bound:
+            # A phase-1 solution ending in a U/D turn was already found
+            # one move shorter, so only the others go on to phase 2
+            if move_face[m] != 0 and move_face[m] != 3:
+                length2, visited = _phase2_solve(cp[c], ep[c], move_face[m], max_length - c,
+                                                 t2_cp, t2_ud, t2_sp, face2, p2_cs, p2_es,
+                                                 path2, max_nodes - nodes)
+                nodes += visited
+                if length2 >= 0:
+                    return c, length2, nodes
+                if nodes > max_nodes:
+                    return -1, 0, nodes
+            continue
+        d = c
+        next_move[d] = 0
+    return -1, 0, nodes
+
+
+def solve_two_phase(cube: RubiksCube, max_length: int = MAX_TWO_PHASE_LENGTH,
+                    max_nodes: int = MAX_NODES,
+                    improve_nodes: int = IMPROVE_NODES) -> Optional[List[str]]:
+    """
+    Near-optimal solution of a 3x3 cube by the two-phase algorithm, or None
+    if nothing within max_length moves turns up inside max_nodes
+    """
+    best = _two_phase_once(cube, max_length, max_nodes)
+    while best:
+        shorter = _two_phase_once(cube, len(best) - 1, improve_nodes)
+        if shorter is None:
+            break
+        best = shorter
+    return best
+
+
+def _two_phase_once(cube: RubiksCube, max_length: int, max_nodes: int) -> Optional[List[str]]:
+    """First two-phase solution of at most max_length moves, or None"""
+    cp, co, ep, eo = cubie.cube_to_cubies(cube)
+    tw, fl, sl, corners = cubie.coordinates(cp, co, ep, eo)
+    tables = cubie.move_tables()
+    pruning = cubie.pruning_tables()
+    tables2 = cubie.phase2_move_tables()
+    pruning2 = cubie.phase2_pruning_tables()
+    phase2 = (tables2['corners'], tables2['ud_edges'], tables2['slice_perm'], cubie.PHASE2_FACE,
+              pruning2['corners_slice'], pruning2['edges_slice'])
+
+    path1 = np.zeros(MAX_PHASE1_DEPTH + 1, dtype=np.int64)
+    path2 = np.zeros(max_length + 1, dtype=np.int64)
+    bound = int(max(pruning['twist_slice'][tw * 495 + sl], pruning['flip_slice'][fl * 495 + sl]))
+    if bound == 0:
+        length2, _ = _phase2_solve(corners, ep, -1, max_length, *phase2, path2, max_nodes)
+        if length2 >= 0:
+            return [cubie.PHASE2_MOVES[m] for m in path2[:length2]]
+        bound = 1
+
+    nodes_left = max_nodes
+    while bound <= min(MAX_PHASE1_DEPTH, max_length) and nodes_left > 0:
+        length1, length2, nodes = _two_phase_search(
+            tw, fl, sl, corners, ep, bound, max_length,
+            tables['twist'], tables['flip'], tables['slice'], tables['corners'],
+            cubie.move_cubies()[2], cubie.MOVE_FACE,
+            pruning['twist_slice'], pruning['flip_slice'],
+            *phase2, path1, path2, nodes_left)
+        if length1 >= 0:
+            return ([cubie.MOVES[m] for m in path1[:length1]] +
+                    [cubie.PHASE2_MOVES[m] for m in path2[:length2]])
+        nodes_left -= nodes
+        bound += 1
+    return None
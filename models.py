@@ -2,70 +2,156 @@
 Rubik's Cube Model and Logic
 Core cube representation and move mechanics
 """
-import random
-import json
-from typing import List, Dict, Tuple, Optional
+import itertools
+from functools import lru_cache
+from typing import List, Dict, Sequence, Tuple, Optional
+
+import numpy as np
+
+from cube_kernels import NUMBA_AVAILABLE, MOVE_IDX, MOVE_NAMES, apply_one, apply_seq, colors_balanced, faces_uniform, run_until_solved
+
+# Face order used for the sticker array and state strings
+FACE_ORDER = ('U', 'R', 'F', 'D', 'L', 'B')
+U, R, F, D, L, B = range(6)
+
+# Every move token apply_move accepts: quarter turns both ways and half turns
+LEGAL_MOVES = frozenset(face + suffix for face in FACE_ORDER for suffix in ('', "'", '2'))
+
+# Sticker codes: code i is the solved color of face i
+COLORS = 'WRGYOB'  # White, Red, Green, Yellow, Orange, Blue
+COLOR_NAMES = ('white', 'red', 'green', 'yellow', 'orange', 'blue')
+
+# Byte lookups between sticker codes and COLORS letters, both directions
+_CODE_TO_LETTER = bytes.maketrans(bytes(range(len(COLORS))), COLORS.encode('ascii'))
+_LETTER_TO_CODE = np.full(256, 255, dtype=np.uint8)
+_LETTER_TO_CODE[np.frombuffer(COLORS.encode('ascii'), dtype=np.uint8)] = np.arange(len(COLORS))
+# Sticker code -> color name, as an object array for one vectorized take
+_CODE_TO_NAME = np.array(COLOR_NAMES, dtype=object)
+
+# Quarter turns used for scrambles, two per face in FACE_ORDER
+SCRAMBLE_MOVES = ('U', "U'", 'R', "R'", 'F', "F'", 'D', "D'", 'L', "L'", 'B', "B'")
+_RNG = np.random.default_rng()
+
+# Process-wide counter, so a state version is never reused (not even by reset)
+_STATE_VERSIONS = itertools.count()
+
+# Packed sticker bytes of the solved cube, per size
+_SOLVED_BYTES: Dict[int, bytes] = {}
+
+def _solved_bytes(size: int) -> bytes:
+    """Sticker buffer of a solved cube of the given size"""
+    packed = _SOLVED_BYTES.get(size)
+    if packed is None:
+        packed = _SOLVED_BYTES[size] = bytes(code for code in range(6) for _ in range(size * size))
+    return packed
 
 class RubiksCube:
+    __slots__ = ('size', 'stickers', 'faces', '_flat', 'move_history',
+                 '_cached_state', '_cached_is_solved', '_cached_is_valid', '_state_version')
+    
     def __init__(self, size: int = 3):
         """Initialize a solved cube with standard color scheme"""
         self.size = size
-        self.faces = {
-            'U': [['W' for _ in range(size)] for _ in range(size)],  # Up (White)
-            'R': [['R' for _ in range(size)] for _ in range(size)],  # Right (Red)
-            'F': [['G' for _ in range(size)] for _ in range(size)],  # Front (Green)
-            'D': [['Y' for _ in range(size)] for _ in range(size)],  # Down (Yellow)
-            'L': [['O' for _ in range(size)] for _ in range(size)],  # Left (Orange)
-            'B': [['B' for _ in range(size)] for _ in range(size)]   # Back (Blue)
-        }
+        # (6, N, N) uint8 sticker codes in FACE_ORDER
+        self.stickers = np.arange(6, dtype=np.uint8).repeat(size * size).reshape(6, size, size)
+        self._bind_faces()
         self.move_history = []
+        # Derived values, cleared whenever the stickers change
+        self._cached_state = None
+        self._cached_is_solved = None
+        self._cached_is_valid = None
+        self._state_version = next(_STATE_VERSIONS)
         
+    def _bind_faces(self):
+        """Expose each face as an (N, N) view into self.stickers"""
+        self.faces = {name: self.stickers[index] for index, name in enumerate(FACE_ORDER)}
+        self._flat = self.stickers.reshape(-1)
+    
+    def _invalidate(self):
+        """Drop cached derived values after a mutation"""
+        self._cached_state = None
+        self._cached_is_solved = None
+        self._cached_is_valid = None
+        self._state_version = next(_STATE_VERSIONS)
+    
     def get_state(self) -> Dict:
         """Get current cube state in frontend-compatible format"""
-        def flatten_face(face):
-            """Convert NxN face to flat array of N² colors"""
-            color_map = {
-                'W': 'white',
-                'R': 'red', 
-                'G': 'green',
-                'Y': 'yellow',
-                'O': 'orange',
-                'B': 'blue'
-            }
-            return [color_map.get(color, color.lower()) for row in face for color in row]
+        if self._cached_state is not None:
+            return self._cached_state
         
+        # One take through the name table, then a flat list of N² colors per face
+        up, right, front, down, left, back = _CODE_TO_NAME.take(self._flat).reshape(6, -1).tolist()
         state = {
-            'front': flatten_face(self.faces['F']),
-            'back': flatten_face(self.faces['B']), 
-            'left': flatten_face(self.faces['L']),
-            'right': flatten_face(self.faces['R']),
-            'top': flatten_face(self.faces['U']),
-            'bottom': flatten_face(self.faces['D']),
+            'front': front,
+            'back': back,
+            'left': left,
+            'right': right,
+            'top': up,
+            'bottom': down,
             'size': self.size  # Include cube size
         }
         
+        self._cached_state = state
         return state
     
+    @classmethod
+    def from_state_string(cls, state_string: str, move_history: Optional[List[str]] = None) -> 'RubiksCube':
+        """Rebuild a cube from a get_state_string() value"""
+        size = int(round((len(state_string) // 6) ** 0.5))
+        cube = cls(size)
+        codes = _LETTER_TO_CODE[np.frombuffer(state_string.encode('ascii'), dtype=np.uint8)]
+        if (codes == 255).any():
+            raise ValueError('State string contains unknown colors')
+        cube.stickers[...] = codes.reshape(6, size, size)
+        cube.move_history = list(move_history or [])
+        return cube
+    
     def get_state_string(self) -> str:
         """Get cube state as string for hashing"""
-        state = ''
-        for face in ['U', 'R', 'F', 'D', 'L', 'B']:
-            for row in self.faces[face]:
-                for color in row:
-                    state += color
-        return state
+        return self.stickers.tobytes().translate(_CODE_TO_LETTER).decode('ascii')
     
     def is_solved(self) -> bool:
         """Check if cube is in solved state"""
-        for face_name, face in self.faces.items():
-            center_row = self.size // 2
-            center_col = self.size // 2
-            center_color = face[center_row][center_col]  # Get center piece color
-            for row in face:
-                for color in row:
-                    if color != center_color:
-                        return False
-        return True
+        if self._cached_is_solved is None:
+            self._cached_is_solved = self._check_solved()
+        return self._cached_is_solved
+    
+    def _check_solved(self) -> bool:
+        """
+        Every face is a single color: one compiled early-exit scan, or a
+        comparison of the packed sticker bytes without numba
+        
+        Not kept as an incremental mismatch count: any uniform coloring is
+        solved (whole-cube rotations, from_state_string schemes), and the
+        result is already cached until the next mutation.
+        """
+        if NUMBA_AVAILABLE:
+            return faces_uniform(self._flat, self.size * self.size)
+        packed = self.stickers.tobytes()
+        if packed == _solved_bytes(self.size):
+            return True
+        
+        # Uniform faces in another color scheme (e.g. from_state_string)
+        n2 = self.size * self.size
+        return all(packed[i:i + n2] == packed[i:i + 1] * n2 for i in range(0, 6 * n2, n2))
+    
+    def state_bytes(self) -> bytes:
+        """Packed sticker codes, a hashable snapshot of the state"""
+        return self.stickers.tobytes()
+    
+    def set_state(self, packed: bytes):
+        """Overwrite the stickers from a state_bytes() snapshot (history untouched)"""
+        self._flat[:] = np.frombuffer(packed, dtype=np.uint8)
+        self._invalidate()
+    
+    def canonical_state(self) -> bytes:
+        """
+        Smallest state_bytes() over the 24 whole-cube rotations
+        
+        Equal for two cubes that differ only in how the whole cube is held,
+        so it can key a table shared by every orientation of a position.
+        """
+        return min(row.tobytes() for row in self._flat.take(build_rotation_tables(self.size)))
     
     def get_move_count(self) -> int:
         """Get number of moves made"""
@@ -73,11 +159,22 @@ class RubiksCube:
     
     def clone(self):
         """Create a deep copy of the cube"""
-        new_cube = RubiksCube(self.size)
-        new_cube.faces = json.loads(json.dumps(self.faces))
+        # Copy the sticker buffer directly instead of building a solved cube to overwrite
+        new_cube = RubiksCube.__new__(RubiksCube)
+        new_cube.size = self.size
+        new_cube.stickers = self.stickers.copy()
+        new_cube._bind_faces()
         new_cube.move_history = self.move_history.copy()
+        new_cube._cached_state = None
+        new_cube._cached_is_solved = self._cached_is_solved
+        new_cube._cached_is_valid = self._cached_is_valid
+        new_cube._state_version = next(_STATE_VERSIONS)
         return new_cube
     
+    def clone_state(self) -> Tuple[bytes, Tuple[str, ...]]:
+        """Stickers and history as a hashable key, without building a new cube"""
+        return self.stickers.tobytes(), tuple(self.move_history)
+    
     def reset(self):
         """Reset to solved state"""
         self.__init__(self.size)
@@ -85,123 +182,146 @@ class RubiksCube:
     def rotate_face_clockwise(self, face: str):
         """Rotate a face 90 degrees clockwise for any size cube"""
         f = self.faces[face]
-        n = self.size
-        
-        # Create temporary copy
-        temp = [row[:] for row in f]
-        
-        # Rotate the face
-        for i in range(n):
-            for j in range(n):
-                f[j][n-1-i] = temp[i][j]
+        f[...] = np.rot90(f, -1).copy()
     
     def rotate_face_counterclockwise(self, face: str):
         """Rotate a face 90 degrees counter-clockwise for any size cube"""
-        f = self.faces[face]  
-        n = self.size
-        
-        # Create temporary copy
-        temp = [row[:] for row in f]
-        
-        # Rotate the face
-        for i in range(n):
-            for j in range(n):
-                f[n-1-j][i] = temp[i][j]
+        f = self.faces[face]
+        f[...] = np.rot90(f, 1).copy()
     
     def apply_move(self, move: str) -> bool:
         """Apply a single move to the cube"""
-        try:
-            if move == 'U':
-                self._move_U()
-            elif move == "U'":
-                self._move_U_prime()
-            elif move == 'R':
-                self._move_R()
-            elif move == "R'":
-                self._move_R_prime()
-            elif move == 'F':
-                self._move_F()
-            elif move == "F'":
-                self._move_F_prime()
-            elif move == 'D':
-                self._move_D()
-            elif move == "D'":
-                self._move_D_prime()
-            elif move == 'L':
-                self._move_L()
-            elif move == "L'":
-                self._move_L_prime()
-            elif move == 'B':
-                self._move_B()
-            elif move == "B'":
-                self._move_B_prime()
-            else:
-                return False
-            
-            self.move_history.append(move)
-            return True
-        except Exception:
+        move_id = MOVE_IDX.get(move)
+        if move_id is None:
             return False
+        
+        # One compiled in-place turn, or one scatter of just the stickers the move touches
+        if NUMBA_AVAILABLE:
+            apply_one(self.stickers, move_id)
+        else:
+            dst, src = build_move_deltas(self.size)[move_id]
+            self._flat[dst] = self._flat[src]
+        self._invalidate()
+        self.move_history.append(move)
+        return True
+    
+    def apply_move_sequence(self, moves: List[str]) -> List[bool]:
+        """Apply a sequence of moves, returning whether each one was applied"""
+        if not NUMBA_AVAILABLE:
+            apply_move = self.apply_move
+            return [apply_move(move) for move in moves]
+        
+        # Compiled path: translate once, then one kernel call for the batch
+        applied = [move in MOVE_IDX for move in moves]
+        self.apply_move_ids(np.array([MOVE_IDX[move] for move in moves if move in MOVE_IDX], dtype=np.int8))
+        return applied
     
-    def apply_move_sequence(self, moves: List[str]):
-        """Apply a sequence of moves"""
-        for move in moves:
-            self.apply_move(move)
+    def apply_move_ids(self, move_ids: np.ndarray):
+        """Apply integer move ids (MOVE_IDX values) without parsing notation"""
+        if not len(move_ids):
+            return
+        if NUMBA_AVAILABLE:
+            apply_seq(self.stickers, move_ids)
+        else:
+            deltas = build_move_deltas(self.size)
+            flat = self._flat
+            for move_id in move_ids.tolist():
+                dst, src = deltas[move_id]
+                flat[dst] = flat[src]
+        self._invalidate()
+        self.move_history.extend([MOVE_NAMES[move_id] for move_id in move_ids.tolist()])
+    
+    def apply_algorithm(self, moves: Tuple[str, ...]):
+        """
+        Apply a fixed move sequence as one precomposed sticker permutation
+        
+        Meant for canned algorithms that are applied over and over; every
+        move must be legal (ValueError otherwise).
+        """
+        moves = tuple(moves)
+        np.copyto(self._flat, self._flat.take(sequence_permutation(self.size, moves)))
+        self._invalidate()
+        self.move_history.extend(moves)
+    
+    def apply_until_solved(self, steps: Sequence[Tuple[Tuple[str, ...], bool]]) -> int:
+        """
+        Apply (moves, check) steps in order, stopping before the first step
+        with check set once the cube is solved; returns the steps applied
+        
+        Each distinct move tuple becomes one precomposed permutation, and
+        the whole run is a single compiled call when numba is available.
+        """
+        if not steps:
+            return 0
+        if not NUMBA_AVAILABLE:
+            for applied, (moves, check) in enumerate(steps):
+                if check and self.is_solved():
+                    return applied
+                self.apply_algorithm(moves)
+            return len(steps)
+        
+        step_moves = [tuple(moves) for moves, _ in steps]
+        distinct = list(dict.fromkeys(step_moves))
+        perms = np.stack([sequence_permutation(self.size, moves) for moves in distinct])
+        index = {moves: i for i, moves in enumerate(distinct)}
+        tape = np.array([index[moves] for moves in step_moves], dtype=np.int64)
+        checks = np.array([check for _, check in steps], dtype=np.bool_)
+        
+        applied = run_until_solved(self._flat, perms, tape, checks)
+        if applied:
+            self._invalidate()
+            for moves in step_moves[:applied]:
+                self.move_history.extend(moves)
+        return applied
     
     def generate_scramble(self, length: int = 25) -> List[str]:
         """Generate a random scramble sequence"""
-        moves = ['U', "U'", 'R', "R'", 'F', "F'", 'D', "D'", 'L', "L'", 'B', "B'"]
-        scramble = []
-        last_face = ''
-        
-        for _ in range(length):
-            # Avoid consecutive moves on same face
-            available_moves = [m for m in moves if m[0] != last_face]
-            move = random.choice(available_moves)
-            scramble.append(move)
-            last_face = move[0]
+        return [SCRAMBLE_MOVES[move_id] for move_id in self.generate_scramble_ids(length).tolist()]
+    
+    def generate_scramble_ids(self, length: int = 25) -> np.ndarray:
+        """Random scramble as int8 move ids, ready for apply_move_ids"""
+        if length <= 0:
+            return np.empty(0, dtype=np.int8)
         
-        return scramble
+        # Avoid consecutive moves on same face: each face is the previous one
+        # plus a random nonzero offset, which is uniform over the other five
+        steps = _RNG.integers(1, 6, size=length)
+        steps[0] = _RNG.integers(0, 6)
+        faces = np.cumsum(steps) % 6
+        # SCRAMBLE_MOVES order matches MOVE_IDX, so these are kernel move ids
+        return (2 * faces + _RNG.integers(0, 2, size=length)).astype(np.int8)
     
     def is_valid_state(self) -> bool:
         """Check if current state is valid and solvable"""
-        # Count colors
-        color_counts = {'W': 0, 'R': 0, 'G': 0, 'Y': 0, 'O': 0, 'B': 0}
-        
-        for face in self.faces.values():
-            for row in face:
-                for color in row:
-                    if color in color_counts:
-                        color_counts[color] += 1
-                    else:
-                        return False
-        
+        if self._cached_is_valid is None:
+            self._cached_is_valid = self._check_valid_state()
+        return self._cached_is_valid
+    
+    def _check_valid_state(self) -> bool:
+        """Count stickers of each color"""
         # Each color should appear exactly size² times
         expected_count = self.size * self.size
-        return all(count == expected_count for count in color_counts.values())
+        if NUMBA_AVAILABLE:
+            return colors_balanced(self._flat, expected_count)
+        color_counts = np.bincount(self._flat, minlength=len(COLORS))
+        return color_counts.size == len(COLORS) and bool((color_counts == expected_count).all())
     
     # Move implementations for any size cube
+    # Faces are (N, N) views into self.stickers, so every update is a
+    # row/column slice assignment; reversed slices read a copy first.
     def _move_U(self):
         """Up face clockwise for any size cube"""
         self.rotate_face_clockwise('U')
         
-        # Rotate adjacent edges (top row)
-        temp = self.faces['F'][0][:]
-        self.faces['F'][0] = self.faces['R'][0][:]
-        self.faces['R'][0] = self.faces['B'][0][:]
-        self.faces['B'][0] = self.faces['L'][0][:]
-        self.faces['L'][0] = temp
+        # Rotate adjacent edges (top row): F <- R <- B <- L <- F
+        self.stickers[[F, R, B, L], 0] = self.stickers[[R, B, L, F], 0]
     
     def _move_U_prime(self):
         """Up face counter-clockwise for any size cube"""
         self.rotate_face_counterclockwise('U')
         
-        # Rotate adjacent edges (reverse of U)
-        temp = self.faces['F'][0][:]
-        self.faces['F'][0] = self.faces['L'][0][:]
-        self.faces['L'][0] = self.faces['B'][0][:]
-        self.faces['B'][0] = self.faces['R'][0][:]
-        self.faces['R'][0] = temp
+        # Rotate adjacent edges (reverse of U): F <- L <- B <- R <- F
+        self.stickers[[F, L, B, R], 0] = self.stickers[[L, B, R, F], 0]
     
     def _move_R(self):
         """Right face clockwise for any size cube"""
@@ -209,125 +329,199 @@ class RubiksCube:
         
         # For NxN cube, move right column of each face
         n = self.size
-        temp = [self.faces['U'][i][n-1] for i in range(n)]
-        for i in range(n):
-            self.faces['U'][i][n-1] = self.faces['F'][i][n-1]
-            self.faces['F'][i][n-1] = self.faces['D'][i][n-1]
-            self.faces['D'][i][n-1] = self.faces['B'][n-1-i][0]
-            self.faces['B'][n-1-i][0] = temp[i]
+        up, front, down, back = self.faces['U'], self.faces['F'], self.faces['D'], self.faces['B']
+        temp = up[:, n-1].copy()
+        up[:, n-1] = front[:, n-1]
+        front[:, n-1] = down[:, n-1]
+        down[:, n-1] = back[::-1, 0]
+        back[::-1, 0] = temp
     
     def _move_R_prime(self):
         """Right face counter-clockwise for any size cube"""
         self.rotate_face_counterclockwise('R')
         
         n = self.size
-        temp = [self.faces['U'][i][n-1] for i in range(n)]
-        for i in range(n):
-            self.faces['U'][i][n-1] = self.faces['B'][n-1-i][0]
-            self.faces['B'][n-1-i][0] = self.faces['D'][i][n-1]
-            self.faces['D'][i][n-1] = self.faces['F'][i][n-1]
-            self.faces['F'][i][n-1] = temp[i]
+        up, front, down, back = self.faces['U'], self.faces['F'], self.faces['D'], self.faces['B']
+        temp = up[:, n-1].copy()
+        up[:, n-1] = back[::-1, 0]
+        back[::-1, 0] = down[:, n-1]
+        down[:, n-1] = front[:, n-1]
+        front[:, n-1] = temp
     
     def _move_F(self):
         """Front face clockwise for any size cube"""
         self.rotate_face_clockwise('F')
         
         n = self.size
-        temp = self.faces['U'][n-1][:]
-        self.faces['U'][n-1] = [self.faces['L'][n-1-i][n-1] for i in range(n)]
-        for i in range(n):
-            self.faces['L'][i][n-1] = self.faces['D'][0][i]
-        self.faces['D'][0] = [self.faces['R'][n-1-i][0] for i in range(n)]
-        for i in range(n):
-            self.faces['R'][i][0] = temp[i]
+        up, left, down, right = self.faces['U'], self.faces['L'], self.faces['D'], self.faces['R']
+        temp = up[n-1].copy()
+        up[n-1] = left[::-1, n-1]
+        left[:, n-1] = down[0]
+        down[0] = right[::-1, 0]
+        right[:, 0] = temp
     
     def _move_F_prime(self):
         """Front face counter-clockwise for any size cube"""
         self.rotate_face_counterclockwise('F')
         
         n = self.size
-        temp = self.faces['U'][n-1][:]
-        for i in range(n):
-            self.faces['U'][n-1][i] = self.faces['R'][i][0]
-        for i in range(n):
-            self.faces['R'][i][0] = self.faces['D'][0][n-1-i]
-        for i in range(n):
-            self.faces['D'][0][i] = self.faces['L'][i][n-1]
-        for i in range(n):
-            self.faces['L'][i][n-1] = temp[n-1-i]
+        up, left, down, right = self.faces['U'], self.faces['L'], self.faces['D'], self.faces['R']
+        temp = up[n-1].copy()
+        up[n-1] = right[:, 0]
+        right[:, 0] = down[0, ::-1]
+        down[0] = left[:, n-1]
+        left[:, n-1] = temp[::-1]
     
     def _move_D(self):
         """Down face clockwise for any size cube"""
         self.rotate_face_clockwise('D')
         
+        # Bottom row: F <- L <- B <- R <- F
         n = self.size
-        temp = self.faces['F'][n-1][:]
-        self.faces['F'][n-1] = self.faces['L'][n-1][:]
-        self.faces['L'][n-1] = self.faces['B'][n-1][:]
-        self.faces['B'][n-1] = self.faces['R'][n-1][:]
-        self.faces['R'][n-1] = temp
+        self.stickers[[F, L, B, R], n-1] = self.stickers[[L, B, R, F], n-1]
     
     def _move_D_prime(self):
         """Down face counter-clockwise for any size cube"""
         self.rotate_face_counterclockwise('D')
         
+        # Bottom row: F <- R <- B <- L <- F
         n = self.size
-        temp = self.faces['F'][n-1][:]
-        self.faces['F'][n-1] = self.faces['R'][n-1][:]
-        self.faces['R'][n-1] = self.faces['B'][n-1][:]
-        self.faces['B'][n-1] = self.faces['L'][n-1][:]
-        self.faces['L'][n-1] = temp
+        self.stickers[[F, R, B, L], n-1] = self.stickers[[R, B, L, F], n-1]
     
     def _move_L(self):
         """Left face clockwise for any size cube"""
         self.rotate_face_clockwise('L')
         
         n = self.size
-        temp = [self.faces['U'][i][0] for i in range(n)]
-        for i in range(n):
-            self.faces['U'][i][0] = self.faces['B'][n-1-i][n-1]
-            self.faces['B'][n-1-i][n-1] = self.faces['D'][i][0]
-            self.faces['D'][i][0] = self.faces['F'][i][0]
-            self.faces['F'][i][0] = temp[i]
+        up, front, down, back = self.faces['U'], self.faces['F'], self.faces['D'], self.faces['B']
+        temp = up[:, 0].copy()
+        up[:, 0] = back[::-1, n-1]
+        back[::-1, n-1] = down[:, 0]
+        down[:, 0] = front[:, 0]
+        front[:, 0] = temp
     
     def _move_L_prime(self):
         """Left face counter-clockwise for any size cube"""
         self.rotate_face_counterclockwise('L')
         
         n = self.size
-        temp = [self.faces['U'][i][0] for i in range(n)]
-        for i in range(n):
-            self.faces['U'][i][0] = self.faces['F'][i][0]
-            self.faces['F'][i][0] = self.faces['D'][i][0]
-            self.faces['D'][i][0] = self.faces['B'][n-1-i][n-1]
-            self.faces['B'][n-1-i][n-1] = temp[i]
+        up, front, down, back = self.faces['U'], self.faces['F'], self.faces['D'], self.faces['B']
+        temp = up[:, 0].copy()
+        up[:, 0] = front[:, 0]
+        front[:, 0] = down[:, 0]
+        down[:, 0] = back[::-1, n-1]
+        back[::-1, n-1] = temp
     
     def _move_B(self):
         """Back face clockwise for any size cube"""
         self.rotate_face_clockwise('B')
         
         n = self.size
-        temp = self.faces['U'][0][:]
-        for i in range(n):
-            self.faces['U'][0][i] = self.faces['R'][i][n-1]
-        for i in range(n):
-            self.faces['R'][i][n-1] = self.faces['D'][n-1][n-1-i]
-        for i in range(n):
-            self.faces['D'][n-1][i] = self.faces['L'][i][0]
-        for i in range(n):
-            self.faces['L'][i][0] = temp[n-1-i]
+        up, left, down, right = self.faces['U'], self.faces['L'], self.faces['D'], self.faces['R']
+        temp = up[0].copy()
+        up[0] = right[:, n-1]
+        right[:, n-1] = down[n-1, ::-1]
+        down[n-1] = left[:, 0]
+        left[:, 0] = temp[::-1]
     
     def _move_B_prime(self):
         """Back face counter-clockwise for any size cube"""
         self.rotate_face_counterclockwise('B')
         
         n = self.size
-        temp = self.faces['U'][0][:]
-        for i in range(n):
-            self.faces['U'][0][i] = self.faces['L'][n-1-i][0]
-        for i in range(n):
-            self.faces['L'][i][0] = self.faces['D'][n-1][i]
-        for i in range(n):
-            self.faces['D'][n-1][i] = self.faces['R'][n-1-i][n-1]
-        for i in range(n):
-            self.faces['R'][i][n-1] = temp[i]
+        up, left, down, right = self.faces['U'], self.faces['L'], self.faces['D'], self.faces['R']
+        temp = up[0].copy()
+        up[0] = left[::-1, 0]
+        left[:, 0] = down[n-1]
+        down[n-1] = right[::-1, n-1]
+        right[:, n-1] = temp
+
+
+@lru_cache(maxsize=None)
+def build_move_tables(size: int) -> np.ndarray:
+    """
+    Sticker permutation of every move for one cube size
+    
+    Row MOVE_IDX[move] of the (moves, 6*N*N) int32 table maps each flat
+    sticker position to the position it is taken from, so a move is
+    stickers.ravel()[table[move_id]]. Rows are read off the _move_* methods
+    applied to a cube whose stickers are their own indices.
+    """
+    probe = RubiksCube.__new__(RubiksCube)
+    probe.size = size
+    tables = np.empty((len(MOVE_IDX), 6 * size * size), dtype=np.int32)
+    for move, move_id in MOVE_IDX.items():
+        probe.stickers = np.arange(6 * size * size, dtype=np.int32).reshape(6, size, size)
+        probe._bind_faces()
+        quarter_turn = getattr(probe, '_move_' + move[0] + ('_prime' if move.endswith("'") else ''))
+        quarter_turn()
+        if move.endswith('2'):
+            quarter_turn()
+        tables[move_id] = probe._flat
+    tables.setflags(write=False)
+    return tables
+
+
+@lru_cache(maxsize=None)
+def build_move_deltas(size: int) -> Tuple[Tuple[np.ndarray, np.ndarray], ...]:
+    """
+    (dst, src) flat indices of the stickers each move actually moves
+    
+    A face turn moves at most N² + 4N of the 6N² stickers (20 of 54 on a 3x3), so
+    flat[dst] = flat[src] does the face rotation and edge cycle in one
+    fancy-indexed copy without reading the untouched faces.
+    """
+    deltas = []
+    for table in build_move_tables(size):
+        dst = np.flatnonzero(table != np.arange(table.size))
+        deltas.append((dst, table[dst].astype(np.intp)))
+    return tuple(deltas)
+
+
+@lru_cache(maxsize=1024)
+def sequence_permutation(size: int, moves: Tuple[str, ...]) -> np.ndarray:
+    """Single gather table equivalent to applying moves in order"""
+    tables = build_move_tables(size)
+    total = np.arange(6 * size * size, dtype=np.int32)
+    for move in moves:
+        if move not in MOVE_IDX:
+            raise ValueError(f'Invalid move: {move}')
+        total = total[tables[MOVE_IDX[move]]]
+    total.setflags(write=False)
+    return total
+
+
+@lru_cache(maxsize=None)
+def build_rotation_tables(size: int) -> np.ndarray:
+    """
+    Sticker permutation of each of the 24 whole-cube rotations for one size
+    
+    Same gather convention as build_move_tables; row 0 is the identity.
+    Generated from x (the whole cube turned like R) and y (like U).
+    """
+    index = np.arange(6 * size * size, dtype=np.int32).reshape(6, size, size)
+    x = np.empty_like(index)
+    x[[U, F, D, B]] = index[[F, D, B, U]]
+    x[[D, B]] = x[[D, B], ::-1, ::-1]
+    x[R] = np.rot90(index[R], -1)
+    x[L] = np.rot90(index[L], 1)
+    y = np.empty_like(index)
+    y[[F, R, B, L]] = index[[R, B, L, F]]
+    y[U] = np.rot90(index[U], -1)
+    y[D] = np.rot90(index[D], 1)
+    generators = (x.reshape(-1), y.reshape(-1))
+    
+    rotations = {index.reshape(-1).tobytes(): index.reshape(-1)}
+    frontier = list(rotations.values())
+    while frontier:
+        reached = []
+        for perm in frontier:
+            for generator in generators:
+                composed = perm[generator]
+                if composed.tobytes() not in rotations:
+                    rotations[composed.tobytes()] = composed
+                    reached.append(composed)
+        frontier = reached
+    tables = np.stack(list(rotations.values()))
+    tables.setflags(write=False)
+    return tables
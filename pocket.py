@@ -0,0 +1,140 @@
+"""
+2x2 Lookup Table
+Optimal (half-turn metric) 2x2 solutions read from a breadth-first table over
+every corner state, with the DBL corner held fixed
+"""
+from functools import lru_cache
+from itertools import permutations
+from math import factorial
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from cubie import CORNER_FACELETS, CORNER_FACES, encode_perm, move_cubies
+from models import RubiksCube
+
+# U, R and F turns never move the DBL corner (slot 6), which pins down the
+# cube's orientation; the table is built over these moves only
+POCKET_MOVES = ('U', "U'", 'U2', 'R', "R'", 'R2', 'F', "F'", 'F2')
+INVERSE_MOVE = tuple(index - index % 3 + (1, 0, 2)[index % 3] for index in range(len(POCKET_MOVES)))
+FIXED_SLOT = 6
+FREE_SLOTS = (0, 1, 2, 3, 4, 5, 7)
+
+N_PERM = factorial(7)
+N_TWIST = 3 ** 6  # Slots 0-5; slot 7 is implied and slot 6 never twists
+N_STATES = N_PERM * N_TWIST
+
+# 2x2 sticker index of each 3x3 corner facelet (U, R, F, D, L, B faces, row-major)
+CORNER_STICKERS = tuple(
+    tuple((index // 9) * 4 + ((index % 9) // 6) * 2 + (index % 3) // 2 for index in facelets)
+    for facelets in CORNER_FACELETS
+)
+
+
+def _encode_perm(cp: np.ndarray) -> np.ndarray:
+    """Rank of the seven free corners' permutation, 0..5039"""
+    free = cp[..., list(FREE_SLOTS)]
+    return encode_perm(free - (free > FIXED_SLOT))
+
+
+def _encode_twist(co: np.ndarray) -> np.ndarray:
+    """Orientation of corners 0-5, 0..728"""
+    return (co[..., :6].astype(np.int64) * 3 ** np.arange(5, -1, -1)).sum(axis=-1)
+
+
+@lru_cache(maxsize=None)
+def move_tables() -> Tuple[np.ndarray, np.ndarray]:
+    """(N_PERM, 9) permutation and (N_TWIST, 9) twist move tables, int32"""
+    m_cp, m_co = move_cubies(POCKET_MOVES)[:2]
+
+    free = np.array(list(permutations(range(7))), dtype=np.int8)
+    all_cp = np.empty((N_PERM, 8), dtype=np.int8)
+    all_cp[:, list(FREE_SLOTS)] = free + (free >= FIXED_SLOT)
+    all_cp[:, FIXED_SLOT] = FIXED_SLOT
+    digits = np.array(np.unravel_index(np.arange(N_TWIST), (3,) * 6)).T
+    all_co = np.zeros((N_TWIST, 8), dtype=np.int8)
+    all_co[:, :6] = digits
+    all_co[:, 7] = -digits.sum(axis=1) % 3
+
+    perm_table = np.empty((N_PERM, len(POCKET_MOVES)), dtype=np.int32)
+    twist_table = np.empty((N_TWIST, len(POCKET_MOVES)), dtype=np.int32)
+    for m in range(len(POCKET_MOVES)):
+        perm_table[:, m] = _encode_perm(all_cp[:, m_cp[m]])
+        twist_table[:, m] = _encode_twist((all_co[:, m_cp[m]] + m_co[m]) % 3)
+    return perm_table, twist_table
+
+
+@lru_cache(maxsize=None)
+def solution_table() -> np.ndarray:
+    """
+    Next move (POCKET_MOVES index) towards solved for every state, int8
+
+    Breadth-first from solved: a state first reached by move m is one m^-1
+    closer to solved. The solved state holds -1. 3.7M states, a couple of seconds to build.
+    """
+    perm_table, twist_table = move_tables()
+    table = np.full(N_STATES, -2, dtype=np.int8)
+    table[0] = -1
+    frontier = np.zeros(1, dtype=np.int64)
+    while len(frontier):
+        perm, twist = np.divmod(frontier, N_TWIST)
+        reached = []
+        for m in range(len(POCKET_MOVES)):
+            nxt = perm_table[perm, m].astype(np.int64) * N_TWIST + twist_table[twist, m]
+            nxt = nxt[table[nxt] == -2]
+            table[nxt] = INVERSE_MOVE[m]
+            reached.append(nxt)
+        frontier = np.unique(np.concatenate(reached))
+    return table
+
+
+def cube_to_state(cube: RubiksCube) -> int:
+    """
+    State index of a 2x2 cube, taking the DBL corner's colors as reference
+
+    Raises ValueError if the stickers are not a real 2x2 cube.
+    """
+    if cube.size != 2:
+        raise ValueError('Lookup table only covers 2x2 cubes')
+    flat = cube.stickers.ravel().tolist()
+    colors = [[flat[index] for index in corner] for corner in CORNER_STICKERS]
+
+    # Opposite faces carry colors c and (c + 3) % 6 in the sticker codes
+    d, b, l = colors[FIXED_SLOT]
+    face_of: Dict[int, int] = {d: 3, (d + 3) % 6: 0, b: 5, (b + 3) % 6: 2, l: 4, (l + 3) % 6: 1}
+    if len(face_of) != 6:
+        raise ValueError('Reference corner colors are inconsistent')
+
+    cp = np.zeros(8, dtype=np.int8)
+    co = np.zeros(8, dtype=np.int8)
+    for position, corner_colors in enumerate(colors):
+        faces = [face_of.get(color, -1) for color in corner_colors]
+        for ori in range(3):
+            if faces[ori] in (0, 3):
+                break
+        else:
+            raise ValueError(f'Corner {position} has no U/D sticker')
+        key = (faces[ori], faces[(ori + 1) % 3], faces[(ori + 2) % 3])
+        if key not in CORNER_FACES:
+            raise ValueError(f'Corner {position} is not a valid cubie')
+        cp[position] = CORNER_FACES.index(key)
+        co[position] = ori
+    if len(set(cp.tolist())) != 8:
+        raise ValueError('Duplicate corner cubies')
+    if co.sum() % 3:
+        raise ValueError('Corner twist is not solvable')
+    return int(_encode_perm(cp)) * N_TWIST + int(_encode_twist(co))
+
+
+def solve(cube: RubiksCube) -> List[str]:
+    """Optimal move sequence for a 2x2 cube (empty when solved)"""
+    state = cube_to_state(cube)
+    table = solution_table()
+    perm_table, twist_table = move_tables()
+    moves = []
+    while table[state] >= 0:
+        m = int(table[state])
+        moves.append(POCKET_MOVES[m])
+        perm, twist = divmod(state, N_TWIST)
+        state = int(perm_table[perm, m]) * N_TWIST + int(twist_table[twist, m])
+    return moves
@@ -6,9 +6,44 @@
 class CubeAPI {
   constructor() {
     this.baseURL = ""; // Same origin
+    this.cubeId = null; // Assigned by /api/new-cube
+    this.size = 3; // Size to recreate the cube at if the server loses it
     this.currentState = this.createSolvedState();
   }
 
+  /**
+   * Build an endpoint URL scoped to this client's cube
+   */
+  url(path) {
+    if (!this.cubeId) return `${this.baseURL}${path}`;
+    return `${this.baseURL}${path}?cube_id=${encodeURIComponent(this.cubeId)}`;
+  }
+
+  /**
+   * Fetch an endpoint for this client's cube. Only /api/new-cube creates
+   * cubes, so a write without one creates it first. A 404 means the server
+   * no longer has the cube (restart or eviction), so forget its id and let
+   * the next write start a new one.
+   */
+  async send(path, options) {
+    const isWrite = options && options.method === "POST";
+    if (!this.cubeId && isWrite && path !== "/api/new-cube") {
+      await this.newCube(this.size);
+    }
+    const response = await fetch(this.url(path), options);
+    if (response.status === 404) this.cubeId = null;
+    return response;
+  }
+
+  /**
+   * Parse a response and remember the cube id the server assigned
+   */
+  async parse(response) {
+    const data = await response.json();
+    if (data.cube_id) this.cubeId = data.cube_id;
+    return data;
+  }
+
   /**
    * Create a solved cube state
    */
@@ -28,10 +63,10 @@ class CubeAPI {
    */
   async getCubeState() {
     try {
-      const response = await fetch(`${this.baseURL}/api/state`);
+      const response = await this.send("/api/state");
       if (!response.ok) throw new Error("Failed to get cube state");
 
-      const data = await response.json();
+      const data = await this.parse(response);
       this.currentState = data.state;
       return data;
     } catch (error) {
@@ -45,13 +80,13 @@ class CubeAPI {
    */
   async resetCube() {
     try {
-      const response = await fetch(`${this.baseURL}/api/reset`, {
+      const response = await this.send("/api/reset", {
         method: "POST",
       });
 
       if (!response.ok) throw new Error("Failed to reset cube");
 
-      const data = await response.json();
+      const data = await this.parse(response);
       this.currentState = data.state;
       return data;
     } catch (error) {
@@ -65,7 +100,7 @@ class CubeAPI {
    */
   async newCube(size = 3) {
     try {
-      const response = await fetch(`${this.baseURL}/api/new-cube`, {
+      const response = await this.send("/api/new-cube", {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
@@ -75,7 +110,8 @@ class CubeAPI {
 
       if (!response.ok) throw new Error("Failed to create new cube");
 
-      const data = await response.json();
+      const data = await this.parse(response);
+      this.size = size;
       this.currentState = data.state;
       return data;
     } catch (error) {
@@ -89,7 +125,7 @@ class CubeAPI {
    */
   async scrambleCube(moves = 25) {
     try {
-      const response = await fetch(`${this.baseURL}/api/scramble`, {
+      const response = await this.send("/api/scramble", {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
@@ -99,7 +135,7 @@ class CubeAPI {
 
       if (!response.ok) throw new Error("Failed to scramble cube");
 
-      const data = await response.json();
+      const data = await this.parse(response);
       this.currentState = data.state;
       return data;
     } catch (error) {
@@ -113,7 +149,7 @@ class CubeAPI {
    */
   async applyMove(move) {
     try {
-      const response = await fetch(`${this.baseURL}/api/move`, {
+      const response = await this.send("/api/move", {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
@@ -123,7 +159,7 @@ class CubeAPI {
 
       if (!response.ok) throw new Error(`Failed to apply move: ${move}`);
 
-      const data = await response.json();
+      const data = await this.parse(response);
       this.currentState = data.state;
       return data;
     } catch (error) {
@@ -137,7 +173,7 @@ class CubeAPI {
    */
   async applyMoves(moves) {
     try {
-      const response = await fetch(`${this.baseURL}/api/moves`, {
+      const response = await this.send("/api/moves", {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
@@ -147,7 +183,7 @@ class CubeAPI {
 
       if (!response.ok) throw new Error("Failed to apply moves");
 
-      const data = await response.json();
+      const data = await this.parse(response);
       this.currentState = data.state;
       return data;
     } catch (error) {
@@ -161,7 +197,7 @@ class CubeAPI {
    */
   async solveCube(algorithm = "kociemba") {
     try {
-      const response = await fetch(`${this.baseURL}/api/solve`, {
+      const response = await this.send("/api/solve", {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
@@ -171,7 +207,7 @@ class CubeAPI {
 
       if (!response.ok) throw new Error("Failed to solve cube");
 
-      const data = await response.json();
+      const data = await this.parse(response);
 
       if (!data.success) {
         throw new Error(data.error || "Solving failed");
@@ -189,10 +225,10 @@ class CubeAPI {
    */
   async isSolved() {
     try {
-      const response = await fetch(`${this.baseURL}/api/is_solved`);
+      const response = await this.send("/api/is_solved");
       if (!response.ok) throw new Error("Failed to check if solved");
 
-      const data = await response.json();
+      const data = await this.parse(response);
       return data.solved;
     } catch (error) {
       console.error("Error checking if solved:", error);
@@ -205,10 +241,10 @@ class CubeAPI {
    */
   async getStats() {
     try {
-      const response = await fetch(`${this.baseURL}/api/stats`);
+      const response = await this.send("/api/stats");
       if (!response.ok) throw new Error("Failed to get stats");
 
-      const data = await response.json();
+      const data = await this.parse(response);
       return data;
     } catch (error) {
       console.error("Error getting stats:", error);
@@ -345,7 +381,7 @@ class CubeAPI {
    */
   async testConnection() {
     try {
-      const response = await fetch(`${this.baseURL}/api/state`);
+      const response = await this.send("/api/state");
       return response.ok;
     } catch (error) {
       return false;
@@ -0,0 +1,8 @@
+"""
+WSGI entry point
+Run with: gunicorn -c gunicorn.conf.py wsgi:app
+"""
+from app import app
+
+if __name__ == '__main__':
+    app.run(host='0.0.0.0', port=5000, threaded=True)